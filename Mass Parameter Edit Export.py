@@ -1,10 +1,25 @@
 import adsk.core, adsk.fusion, traceback
+import math
 import os
-import re
+import time
+
+try:
+    from . import archive_io, batch_core, job_queue, mesh_io
+except ImportError:
+    import archive_io
+    import batch_core
+    import job_queue
+    import mesh_io
 
 # Global list to keep handlers alive
 handlers = []
 
+# Exportable objects of the active design, scanned once per dialog
+entityIndex = None
+
+# Component checkboxes shown at once; the filter narrows down larger assemblies
+COMPONENT_LIST_LIMIT = 100
+
 def run(context):
     ui = None
     try:
@@ -38,12 +53,481 @@ def run(context):
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
 
-def sanitize_id(name):
-    """Convert name to valid ID by removing invalid characters"""
-    safe_id = re.sub(r'[^a-zA-Z0-9_]', '_', name)
-    if not safe_id[0].isalpha():
-        safe_id = 'obj_' + safe_id
-    return safe_id
+def get_entity_index(design):
+    """Index of the root bodies and all occurrences, built on first use"""
+    global entityIndex
+    if entityIndex is None:
+        rootComp = design.rootComponent
+        index = batch_core.ObjectIndex()
+        for body in rootComp.bRepBodies:
+            index.add('body', body.name, body.name, body)
+        for occ in rootComp.allOccurrences:
+            index.add('comp', occ.name, occ.fullPathName, occ)
+        entityIndex = index.finish()
+    return entityIndex
+
+
+def show_component_matches(compInputs, index, text):
+    """Show the components matching a filter, creating their checkboxes on demand"""
+    matches = index.matching('comp', text)
+    shown = set()
+    for entry in matches[:COMPONENT_LIST_LIMIT]:
+        checkbox = compInputs.itemById(entry.inputId)
+        if not checkbox:
+            checkbox = compInputs.addBoolValueInput(entry.inputId, entry.displayName, True, '', entry.selected)
+            checkbox.tooltip = f'Export component: {entry.path}'
+            entry.listed = True
+        checkbox.isVisible = True
+        shown.add(entry.inputId)
+    
+    for entry in index.of_kind('comp'):
+        if entry.listed and entry.inputId not in shown:
+            compInputs.itemById(entry.inputId).isVisible = False
+    
+    update_component_info(compInputs, index, len(matches))
+    return matches
+
+
+def update_component_info(compInputs, index, matchCount):
+    components = index.of_kind('comp')
+    info = f'{matchCount} of {len(components)} components match'
+    if matchCount > COMPONENT_LIST_LIMIT:
+        info += f' (first {COMPONENT_LIST_LIMIT} shown)'
+    info += f', {sum(1 for entry in components if entry.selected)} selected'
+    compInputs.itemById('compMatchInfo').text = info
+
+
+def get_entity_bodies(entity):
+    """Return the bodies of a body or occurrence, including nested occurrences"""
+    body = adsk.fusion.BRepBody.cast(entity)
+    if body:
+        return [body]
+    
+    occ = adsk.fusion.Occurrence.cast(entity)
+    if not occ:
+        return []
+    
+    bodies = list(occ.bRepBodies)
+    for child in occ.childOccurrences:
+        bodies.extend(get_entity_bodies(child))
+    return bodies
+
+
+def is_text_parameter(param):
+    """Whether a user parameter holds text; text parameters keep their quotes in the expression"""
+    return param.expression.strip().startswith("'")
+
+
+def table_sweep_axes(design, variationTable):
+    """One sweep axis per variation table column, each naming a user parameter"""
+    sweepAxes = []
+    for columnIdx, columnName in enumerate(variationTable.columns):
+        userParam = design.userParameters.itemByName(columnName)
+        if not userParam:
+            raise ValueError(f'Parameter not found: {columnName}')
+        sweepAxes.append(batch_core.SweepAxis(columnName, batch_core.TableColumn(variationTable, columnIdx), is_text_parameter(userParam),
+                                              userParam.expression, userParam))
+    return sweepAxes
+
+
+def capture_compute_state(design, selectedObjects):
+    """Snapshot timeline health states and body geometry of the selected objects"""
+    state = []
+    
+    if design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        timeline = design.timeline
+        for i in range(timeline.count):
+            state.append(timeline.item(i).healthState)
+    
+    for objName, objEntity in selectedObjects:
+        for body in get_entity_bodies(objEntity):
+            box = body.boundingBox
+            state.append((
+                body.faces.count,
+                body.edges.count,
+                round(box.minPoint.x, 6), round(box.minPoint.y, 6), round(box.minPoint.z, 6),
+                round(box.maxPoint.x, 6), round(box.maxPoint.y, 6), round(box.maxPoint.z, 6)
+            ))
+    
+    return tuple(state)
+
+
+def wait_for_compute(design, selectedObjects, timeout):
+    """Poll until compute has settled, backing off exponentially.
+    
+    Compute counts as settled once two consecutive snapshots of the timeline
+    health and body geometry are identical. Returns (settled, secondsWaited).
+    """
+    start = time.perf_counter()
+    delay = 0.001
+    previousState = None
+    
+    while True:
+        adsk.doEvents()
+        state = capture_compute_state(design, selectedObjects)
+        elapsed = time.perf_counter() - start
+        
+        if state == previousState:
+            return True, elapsed
+        if elapsed >= timeout:
+            return False, elapsed
+        
+        previousState = state
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+
+def parameter_dependents(param):
+    """Every parameter whose value depends on param, directly or through other parameters"""
+    dependents = {}
+    stack = [param]
+    while stack:
+        for dependent in stack.pop().dependentParameters:
+            if dependent.name not in dependents:
+                dependents[dependent.name] = dependent
+                stack.append(dependent)
+    return list(dependents.values())
+
+
+def owning_timeline_object(modelParam):
+    """Timeline object of the feature, sketch or construction that owns a model parameter, or None"""
+    owner = modelParam.createdBy
+    for candidate in (owner, getattr(owner, 'parentSketch', None)):
+        try:
+            timelineObject = candidate.timelineObject if candidate else None
+        except:
+            timelineObject = None
+        if timelineObject:
+            return timelineObject
+    return None
+
+
+def compute_dependencies(design, param):
+    """Earliest timeline index a parameter drives, and why a full compute is needed (None if not).
+    
+    Walks the parameters that depend on param down to the model
+    parameters and the timeline features that own them. Returns
+    (None, None) when param drives no feature at all.
+    """
+    if design.designType != adsk.fusion.DesignTypes.ParametricDesignType:
+        return None, 'direct modeling design without a timeline'
+    
+    firstIndex = None
+    for dependent in parameter_dependents(param):
+        modelParam = adsk.fusion.ModelParameter.cast(dependent)
+        if not modelParam:
+            # User parameters only pass the change on
+            continue
+        timelineObject = owning_timeline_object(modelParam)
+        if timelineObject is None:
+            return None, f'{modelParam.name} is not owned by a timeline feature'
+        if timelineObject.isSuppressed or timelineObject.isRolledBack:
+            continue
+        firstIndex = timelineObject.index if firstIndex is None else min(firstIndex, timelineObject.index)
+    return firstIndex, None
+
+
+def geometry_fingerprint(entities, exportKey):
+    """Hash the exported geometry of bodies/occurrences together with the export options"""
+    bodyRecords = []
+    for entity in entities:
+        for body in get_entity_bodies(entity):
+            props = body.physicalProperties
+            box = body.boundingBox
+            center = props.centerOfMass
+            measurements = (
+                props.volume, props.area,
+                center.x, center.y, center.z,
+                box.minPoint.x, box.minPoint.y, box.minPoint.z,
+                box.maxPoint.x, box.maxPoint.y, box.maxPoint.z
+            )
+            bodyRecords.append((measurements, body.faces.count, body.edges.count))
+    return batch_core.fingerprint_bodies(exportKey, bodyRecords)
+
+
+def calculate_meshes(entities, meshRefinement, meshSettings=None):
+    """Yield a Fusion TriangleMesh per body of bodies/occurrences, at a refinement or custom settings"""
+    quality = QUALITY_MAP.get(meshRefinement, adsk.fusion.TriangleMeshQualityOptions.NormalQualityTriangleMesh)
+    for entity in entities:
+        for body in get_entity_bodies(entity):
+            calculator = body.meshManager.createMeshCalculator()
+            if meshSettings:
+                calculator.surfaceTolerance = meshSettings.surfaceDeviation
+                calculator.maxNormalDeviation = meshSettings.normalDeviation
+                calculator.maxSideLength = meshSettings.maxEdgeLength
+            else:
+                calculator.setQuality(quality)
+            yield calculator.calculate()
+
+
+def tessellate_entities(entities, meshRefinement, meshSettings=None):
+    """Tessellate the bodies of bodies/occurrences into one mesh, in centimeters"""
+    meshes = [mesh_io.TriangleMesh(triangleMesh.nodeCoordinatesAsDouble, triangleMesh.nodeIndices)
+              for triangleMesh in calculate_meshes(entities, meshRefinement, meshSettings)]
+    return mesh_io.TriangleMesh.merge(meshes)
+
+
+def bounding_diagonal(entities):
+    """Diagonal of the bounding box around the bodies of bodies/occurrences, in centimeters"""
+    low = None
+    high = None
+    for entity in entities:
+        for body in get_entity_bodies(entity):
+            box = body.boundingBox
+            corners = ((box.minPoint.x, box.minPoint.y, box.minPoint.z), (box.maxPoint.x, box.maxPoint.y, box.maxPoint.z))
+            low = corners[0] if low is None else tuple(map(min, low, corners[0]))
+            high = corners[1] if high is None else tuple(map(max, high, corners[1]))
+    if low is None:
+        return 0.0
+    return math.sqrt(sum((b - a) ** 2 for a, b in zip(low, high)))
+
+
+def entity_key(entity):
+    """Stable identity of a body or occurrence.
+    
+    Entity tokens of the same entity can differ and == calls into Fusion, so
+    occurrences are keyed by their full path and bodies by the path of their
+    occurrence and their name.
+    """
+    occ = adsk.fusion.Occurrence.cast(entity)
+    if occ:
+        return occ.fullPathName
+    context = entity.assemblyContext
+    return (context.fullPathName if context else '', entity.name)
+
+
+def isolate_selection(rootComp, selectedObjects, occurrences=None):
+    """Hide every root body and occurrence that is not part of the selection.
+    
+    Occurrences stay visible when they are selected, inside a selected
+    occurrence or contain one. Returns (entity, wasVisible) pairs for
+    restore_visibility.
+    """
+    selectedKeys = {entity_key(objEntity) for objName, objEntity in selectedObjects}
+    changed = []
+    if occurrences is None:
+        occurrences = list(rootComp.allOccurrences)
+    occurrencePaths = [(occ, occ.fullPathName) for occ in occurrences]
+    
+    for body in rootComp.bRepBodies:
+        # Root bodies have no occurrence (see entity_key)
+        visible = ('', body.name) in selectedKeys
+        if body.isLightBulbOn != visible:
+            changed.append((body, body.isLightBulbOn))
+            body.isLightBulbOn = visible
+    
+    keepVisible = set()
+    for occ, path in occurrencePaths:
+        if path not in selectedKeys:
+            continue
+        # Keep the selected occurrence and all of its parents visible
+        parent = occ
+        while path not in keepVisible:
+            keepVisible.add(path)
+            parent = parent.assemblyContext
+            if not parent:
+                break
+            path = parent.fullPathName
+    
+    for occ, path in occurrencePaths:
+        visible = path in keepVisible
+        if not visible:
+            # Children of a selected occurrence are exported with it
+            parent = occ.assemblyContext
+            while parent and not visible:
+                visible = parent.fullPathName in selectedKeys
+                parent = parent.assemblyContext
+        if occ.isLightBulbOn != visible:
+            changed.append((occ, occ.isLightBulbOn))
+            occ.isLightBulbOn = visible
+    
+    return changed
+
+
+def restore_visibility(changed):
+    """Undo isolate_selection"""
+    for entity, wasVisible in reversed(changed):
+        try:
+            entity.isLightBulbOn = wasVisible
+        except:
+            pass
+
+
+# Map unit selection to MeshUnits enum
+UNIT_MAP = {
+    'Millimeters': adsk.fusion.MeshUnits.MillimeterMeshUnit,
+    'Centimeters': adsk.fusion.MeshUnits.CentimeterMeshUnit,
+    'Meters': adsk.fusion.MeshUnits.MeterMeshUnit,
+    'Inches': adsk.fusion.MeshUnits.InchMeshUnit,
+    'Feet': adsk.fusion.MeshUnits.FootMeshUnit
+}
+
+REFINEMENT_MAP = {
+    'Low': adsk.fusion.MeshRefinementSettings.MeshRefinementLow,
+    'Medium': adsk.fusion.MeshRefinementSettings.MeshRefinementMedium,
+    'High': adsk.fusion.MeshRefinementSettings.MeshRefinementHigh
+}
+
+QUALITY_MAP = {
+    'Low': adsk.fusion.TriangleMeshQualityOptions.LowQualityTriangleMesh,
+    'Medium': adsk.fusion.TriangleMeshQualityOptions.NormalQualityTriangleMesh,
+    'High': adsk.fusion.TriangleMeshQualityOptions.HighQualityTriangleMesh
+}
+
+
+class FusionBackend(batch_core.ExportBackend):
+    """Runs the batch loop against the active Fusion design"""
+    def __init__(self, app, design, selectedObjects, occurrences=None):
+        self.app = app
+        self.design = design
+        self.selectedObjects = selectedObjects
+        self.occurrences = occurrences
+        self.hiddenEntities = []
+        
+    def begin(self, config, units):
+        # Timeline features each swept parameter drives, worked out once per run
+        self.dependencies = {}
+        if config.selectiveCompute:
+            for axis in config.axes:
+                try:
+                    self.dependencies[axis.name] = compute_dependencies(self.design, axis.param)
+                except:
+                    self.dependencies[axis.name] = (None, f'could not walk the dependencies of {axis.name}')
+        self.exportMgr = self.design.exportManager
+        self.exportUnit = UNIT_MAP.get(config.selectedUnit, adsk.fusion.MeshUnits.MillimeterMeshUnit)
+        if config.combineObjects:
+            self.hiddenEntities = isolate_selection(self.design.rootComponent, self.selectedObjects, self.occurrences)
+        
+    def set_parameter(self, axis, expression):
+        axis.param.expression = expression
+        
+    def compute(self):
+        # Failures reach the batch loop, which records and retries them
+        self.design.computeAll()
+        
+    def compute_changed(self, changedAxes):
+        # Setting an expression already recomputes the features that depend on it;
+        # computeAll is only needed when that cannot be trusted
+        firstIndex = None
+        for axis in changedAxes:
+            axisFirst, reason = self.dependencies.get(axis.name, (None, 'dependencies unknown'))
+            if reason:
+                self.compute()
+                return batch_core.COMPUTE_FULL, reason
+            if axisFirst is not None:
+                firstIndex = axisFirst if firstIndex is None else min(firstIndex, axisFirst)
+        
+        # Later features may use geometry of the changed ones, so check everything from the first
+        if firstIndex is not None:
+            timeline = self.design.timeline
+            for i in range(firstIndex, timeline.count):
+                timelineObject = timeline.item(i)
+                if timelineObject.isRolledBack:
+                    break
+                if timelineObject.healthState == adsk.fusion.FeatureHealthStates.ErrorFeatureHealthState:
+                    self.compute()
+                    return batch_core.COMPUTE_FULL, 'a dependent feature failed to update'
+        return batch_core.COMPUTE_INCREMENTAL, None
+        
+    def wait_for_compute(self, timeout):
+        return wait_for_compute(self.design, self.selectedObjects, timeout)
+    
+    def refresh(self):
+        # Single viewport refresh
+        self.app.activeViewport.refresh()
+        
+    def fingerprint(self, unit, exportKey):
+        return geometry_fingerprint(unit.contents, exportKey)
+    
+    def _set_refinement(self, options, config, meshSettings):
+        """Use the batch refinement (a retry may lower it), or custom tolerances from adaptive refinement"""
+        if meshSettings is None:
+            options.meshRefinement = REFINEMENT_MAP.get(config.meshRefinement, adsk.fusion.MeshRefinementSettings.MeshRefinementMedium)
+            return
+        options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementCustom
+        options.surfaceDeviation = meshSettings.surfaceDeviation
+        options.normalDeviation = meshSettings.normalDeviation
+        options.maximumEdgeLength = meshSettings.maxEdgeLength
+        
+    def export(self, unit, config, fullPath, selectedFormat, meshSettings=None):
+        exportMgr = self.exportMgr
+        objEntity = unit.entity
+        
+        # Export based on format with selected unit
+        if 'STL' in selectedFormat:
+            stlOpts = exportMgr.createSTLExportOptions(objEntity, fullPath)
+            stlOpts.isBinaryFormat = 'Binary' in selectedFormat
+            stlOpts.isOneFilePerBody = False
+            self._set_refinement(stlOpts, config, meshSettings)
+            stlOpts.sendToPrintUtility = False
+            stlOpts.unit = self.exportUnit
+            exportMgr.execute(stlOpts)
+            
+        elif '3MF' in selectedFormat:
+            mfOpts = exportMgr.createC3MFExportOptions(objEntity, fullPath)
+            self._set_refinement(mfOpts, config, meshSettings)
+            # 3MF uses millimeters by default
+            exportMgr.execute(mfOpts)
+            
+        elif 'OBJ' in selectedFormat:
+            objOpts = exportMgr.createOBJExportOptions(objEntity, fullPath)
+            self._set_refinement(objOpts, config, meshSettings)
+            objOpts.unit = self.exportUnit
+            exportMgr.execute(objOpts)
+            
+        elif 'STEP' in selectedFormat:
+            stepOpts = exportMgr.createSTEPExportOptions(fullPath, objEntity)
+            exportMgr.execute(stepOpts)
+            
+        elif 'F3D' in selectedFormat:
+            f3dOpts = exportMgr.createFusionArchiveExportOptions(fullPath)
+            exportMgr.execute(f3dOpts)
+            
+    def tessellate(self, unit, config, meshSettings=None):
+        return tessellate_entities(unit.contents, config.meshRefinement, meshSettings)
+    
+    def bounding_diagonal(self, unit):
+        return bounding_diagonal(unit.contents)
+    
+    def triangle_count(self, unit, meshSettings):
+        return sum(triangleMesh.triangleCount for triangleMesh in calculate_meshes(unit.contents, None, meshSettings))
+    
+    def finish(self, config):
+        restore_visibility(self.hiddenEntities)
+        self.hiddenEntities = []
+        
+        # Restore parameters
+        try:
+            for axis in config.axes:
+                axis.param.expression = axis.originalExpression
+            try:
+                self.design.computeAll()
+            except:
+                pass
+            adsk.doEvents()
+        except:
+            pass
+        
+        # Fast mode skipped every redraw, so restore the viewport once
+        if config.fastMode:
+            try:
+                self.app.activeViewport.refresh()
+            except:
+                pass
+
+
+class FusionProgress(batch_core.ProgressReporter):
+    """Shows batch progress in a Fusion progress dialog"""
+    def __init__(self, progressDialog):
+        self.progressDialog = progressDialog
+        
+    def is_cancelled(self):
+        return self.progressDialog.wasCancelled
+    
+    def update(self, value, message=None):
+        self.progressDialog.progressValue = value
+        if message:
+            self.progressDialog.message = message
 
 
 class MyCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
@@ -72,17 +556,13 @@ class MyCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             
             inputs = cmd.commandInputs
             
-            # Get data
+            # Get data; the object index is rebuilt for every dialog and reused on execute
+            global entityIndex
+            entityIndex = None
             userParams = design.userParameters
-            rootComp = design.rootComponent
-            
-            bodies = []
-            for body in rootComp.bRepBodies:
-                bodies.append(body.name)
-            
-            components = []
-            for occ in rootComp.allOccurrences:
-                components.append(occ.name)
+            index = get_entity_index(design)
+            bodies = index.of_kind('body')
+            components = index.of_kind('comp')
             
             # 1. Parameter dropdown
             paramDropdown = inputs.addDropDownCommandInput(
@@ -110,7 +590,34 @@ class MyCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
                 8,
                 False
             )
-            variationsInput.tooltip = 'Enter all variations separated by commas. Example: A, B, C, D'
+            variationsInput.tooltip = ('Enter all variations separated by commas. Example: A, B, C, D\n'
+                                       'Numeric parameters also accept ranges: 10:100:0.5, linspace 5..50 n=200, 10 mm:2 in:1 mm\n'
+                                       '@values.csv reads values from a file (relative to the output folder)')
+            
+            # Additional swept parameters
+            sweepGroup = inputs.addGroupCommandInput('sweepGroup', 'Additional Parameters')
+            sweepGroup.isExpanded = False
+            sweepGroup.isEnabledCheckBoxDisplayed = False
+            sweepInputs = sweepGroup.children
+            
+            extraParamsInput = sweepInputs.addTextBoxCommandInput(
+                'extraParams',
+                'Parameters (one per line)',
+                '',
+                4,
+                False
+            )
+            extraParamsInput.tooltip = 'Sweep more user parameters, one per line. Example: size = 10, 20, 30'
+            
+            sweepMode = sweepInputs.addRadioButtonGroupCommandInput('sweepMode', 'Combine')
+            sweepMode.listItems.add('All combinations', True)
+            sweepMode.listItems.add('Zip (pair values by position)', False)
+            sweepMode.tooltip = 'All combinations exports every value against every other value. Zip pairs the n-th values of each parameter.'
+            
+            tableInput = sweepInputs.addStringValueInput('variationTable', 'Variation table (CSV/JSONL)', '')
+            tableInput.tooltip = ('One variation per row, read from the file as the export runs (relative to the output folder). '
+                                  'Columns name user parameters; _filename sets the output filename and _objects the objects to export '
+                                  '(separated by ;). Replaces the parameter and variations above.')
             
             # Add spacer
             inputs.addTextBoxCommandInput('spacer1', '', '', 1, True)
@@ -135,6 +642,12 @@ class MyCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             # Include parameter name
             namingInputs.addBoolValueInput('includeParamName', 'Include parameter name in filename', True, '', False)
             
+            # Template (overrides the options above except prefix/suffix values)
+            templateInput = namingInputs.addStringValueInput('filenameTemplate', 'Template (optional)', '')
+            templateInput.tooltip = ('For example {prefix}_{n:03}_{param}={value}_{object}{ext}. Fields: {prefix}, {suffix}, '
+                                     '{n} (variation number), {param}/{value} (first parameter), {values} (all values), '
+                                     '{object}, {ext} and any swept parameter name. Empty uses the options above.')
+            
             # 5. EXPORT FORMAT GROUP
             formatGroup = inputs.addGroupCommandInput('formatGroup', 'Export Format')
             formatGroup.isExpanded = True
@@ -182,6 +695,55 @@ class MyCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             meshRefinement.tooltip = 'Higher refinement = smoother curves but larger files'
             meshRefinement.isVisible = True
             
+            adaptiveInput = formatInputs.addDropDownCommandInput(
+                'adaptiveMesh',
+                'Adaptive Refinement',
+                adsk.core.DropDownStyles.LabeledIconDropDownStyle
+            )
+            for modeName, adaptiveMode in batch_core.ADAPTIVE_MODES.items():
+                adaptiveInput.listItems.add(modeName, not adaptiveMode)
+            adaptiveInput.tooltip = ('Choose custom surface deviation, normal deviation and maximum edge length per object and variation, '
+                                     'scaled from its bounding box (starting from the refinement above) or searched to hit the target. '
+                                     f'Chosen settings are cached in {batch_core.MESH_SETTINGS_FILE} by geometry.')
+            
+            meshTargetInput = formatInputs.addIntegerSpinnerCommandInput('meshTarget', 'Target (triangles or KB)', 0, 100000000, 1000, 0)
+            meshTargetInput.tooltip = 'Triangle count per file, or file size in KB of the first mesh format, for the target modes'
+            
+            # Additional mesh formats written from the same variation
+            extraFormats = formatInputs.addDropDownCommandInput(
+                'extraFormats',
+                'Also Export As',
+                adsk.core.DropDownStyles.CheckBoxDropDownStyle
+            )
+            for formatName in batch_core.FORMATS:
+                if batch_core.is_mesh_format(formatName):
+                    extraFormats.listItems.add(formatName, False)
+            extraFormats.tooltip = 'Write these mesh formats as well for every variation'
+            
+            tessellateInput = formatInputs.addBoolValueInput('tessellateOnce', 'Tessellate once for all mesh formats', True, '', False)
+            tessellateInput.tooltip = ('Triangulate each object once per variation and write STL/OBJ/3MF directly. '
+                                       'Much faster with several mesh formats; OBJ and 3MF are written without color')
+            
+            combineInput = formatInputs.addBoolValueInput('combineObjects', 'One file per variation (all objects)', True, '', False)
+            combineInput.tooltip = 'Export all selected objects together into a single file per variation instead of one file per object'
+            
+            # Regeneration options
+            computeGroup = inputs.addGroupCommandInput('computeGroup', 'Regeneration')
+            computeGroup.isExpanded = False
+            computeGroup.isEnabledCheckBoxDisplayed = False
+            computeInputs = computeGroup.children
+            
+            computeTimeout = computeInputs.addFloatSpinnerCommandInput('computeTimeout', 'Compute timeout (s)', '', 0.5, 600, 0.5, 30)
+            computeTimeout.tooltip = 'Maximum time to wait for each variation to finish recomputing before exporting'
+            
+            fastModeInput = computeInputs.addBoolValueInput('fastMode', 'Performance mode (no viewport redraw)', True, '', False)
+            fastModeInput.tooltip = 'Skip the viewport refresh after each variation and update the progress dialog at most twice per second. The viewport is redrawn once at the end.'
+            
+            selectiveInput = computeInputs.addBoolValueInput('selectiveCompute', 'Selective recompute', True, '', False)
+            selectiveInput.tooltip = ('Rely on the recompute Fusion does when a parameter changes instead of recomputing the whole timeline. '
+                                      'A full compute is still run when a swept parameter drives something outside the timeline '
+                                      'or a dependent feature fails. The summary and manifest show which path each variation took.')
+            
             # Add spacer
             inputs.addTextBoxCommandInput('spacer2', '', '', 1, True)
             
@@ -192,22 +754,25 @@ class MyCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
                 bodyGroup.isEnabledCheckBoxDisplayed = False
                 bodyInputs = bodyGroup.children
                 
-                for body in bodies:
-                    safe_id = sanitize_id(body)
-                    checkbox = bodyInputs.addBoolValueInput(f'body_{safe_id}', body, True, '', False)
-                    checkbox.tooltip = f'Export body: {body}'
+                for entry in bodies:
+                    checkbox = bodyInputs.addBoolValueInput(entry.inputId, entry.displayName, True, '', False)
+                    checkbox.tooltip = f'Export body: {entry.path}'
+                    entry.listed = True
             
             # 7. Group for components
             if components:
                 compGroup = inputs.addGroupCommandInput('compGroup', 'Components')
-                compGroup.isExpanded = True
+                compGroup.isExpanded = len(components) <= COMPONENT_LIST_LIMIT
                 compGroup.isEnabledCheckBoxDisplayed = False
                 compInputs = compGroup.children
                 
-                for comp in components:
-                    safe_id = sanitize_id(comp)
-                    checkbox = compInputs.addBoolValueInput(f'comp_{safe_id}', comp, True, '', False)
-                    checkbox.tooltip = f'Export component: {comp}'
+                # Large assemblies are filtered instead of listing thousands of checkboxes
+                filterInput = compInputs.addStringValueInput('compFilter', 'Filter', '')
+                filterInput.tooltip = 'Show only components whose path contains all of these words'
+                compInputs.addBoolValueInput('compSelectMatching', 'Select all matching', False, '', False)
+                compInputs.addBoolValueInput('compClearSelection', 'Clear selection', False, '', False)
+                compInputs.addTextBoxCommandInput('compMatchInfo', '', '', 1, True)
+                show_component_matches(compInputs, index, '')
             
             # Add spacer
             inputs.addTextBoxCommandInput('spacer3', '', '', 1, True)
@@ -221,6 +786,92 @@ class MyCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             folderInputs.addTextBoxCommandInput('outputFolder', 'Folder Path', '', 2, True)
             folderInputs.addBoolValueInput('browseBtn', 'Browse...', False, '', False)
             
+            reuseInput = folderInputs.addBoolValueInput('reuseDuplicates', 'Reuse files for identical geometry', True, '', False)
+            reuseInput.tooltip = 'Skip exporting variations whose geometry matches a file already written (also across runs). Duplicates become hardlinks or copies.'
+            
+            runMode = folderInputs.addDropDownCommandInput(
+                'runMode',
+                'Run Mode',
+                adsk.core.DropDownStyles.LabeledIconDropDownStyle
+            )
+            runMode.listItems.add('Export everything', True)
+            runMode.listItems.add('Resume (skip completed files)', False)
+            runMode.listItems.add('Rebuild changed only', False)
+            runMode.listItems.add('Retry failed files only', False)
+            runMode.tooltip = (f'Every export is recorded in {batch_core.MANIFEST_FILE}. Resume skips files that are already complete; '
+                               'rebuild changed only also re-exports files whose parameter values or export options changed. '
+                               f'Retry failed files only re-runs the files listed in {batch_core.FAILED_JOB_FILE} by the last run.')
+            
+            retryInput = folderInputs.addIntegerSpinnerCommandInput('retryAttempts', 'Retry failures', 0, 5, 1, 1)
+            retryInput.tooltip = (f'Failures are logged with stage, traceback and parameter values to {batch_core.FAILURES_FILE}. '
+                                  'Failed files are retried this many times at the end of the run.')
+            
+            retryFactorInput = folderInputs.addFloatSpinnerCommandInput('retryTimeoutFactor', 'Retry compute wait factor', '', 1.0, 10.0, 0.5, 2.0)
+            retryFactorInput.tooltip = 'Each retry waits this many times longer for compute to settle'
+            
+            retryRefinementInput = folderInputs.addBoolValueInput('retryLowerRefinement', 'Retry with lower mesh refinement', True, '', False)
+            retryRefinementInput.tooltip = 'Each retry tessellates one refinement step coarser (High, Medium, Low)'
+            
+            archiveInput = folderInputs.addDropDownCommandInput(
+                'archiveMode',
+                'Output',
+                adsk.core.DropDownStyles.LabeledIconDropDownStyle
+            )
+            for modeName, archiveKind in batch_core.ARCHIVE_MODES.items():
+                # tar.zst needs the zstandard package
+                if not archiveKind or archiveKind in archive_io.archive_kinds():
+                    archiveInput.listItems.add(modeName, not archiveKind)
+            archiveInput.tooltip = ('Stream every file into one archive in the output folder instead of leaving loose files. '
+                                    'Each file is deleted as soon as it is archived; identical geometry is stored once. '
+                                    'Archives are always written from scratch, so resume and rebuild are ignored; retrying failed files writes a new archive.')
+            
+            estimateInput = folderInputs.addBoolValueInput('estimateFirst', 'Estimate time and disk use first', True, '', False)
+            estimateInput.tooltip = ('Export a few variations spread over the sweep into a temporary folder before asking to continue, '
+                                     'and show the expected run time and disk use. A failing sample stops the batch. '
+                                     'Measurements are kept between runs, so later estimates work without sampling.')
+            
+            samplesInput = folderInputs.addIntegerSpinnerCommandInput('estimateSamples', 'Sample variations', 1, 20, 1, 3)
+            samplesInput.tooltip = 'Variations exported for the estimate'
+            
+            # 9. Post-processing
+            postGroup = inputs.addGroupCommandInput('postGroup', 'Post-processing')
+            postGroup.isExpanded = False
+            postGroup.isEnabledCheckBoxDisplayed = False
+            postInputs = postGroup.children
+            
+            workersInput = postInputs.addIntegerSpinnerCommandInput('postWorkers', 'Worker processes', 0, 32, 1, 2)
+            workersInput.tooltip = 'Checksumming, conversion, compression and copying run in this many background workers while the next variation exports. 0 runs them in the export loop.'
+            
+            binaryStlInput = postInputs.addBoolValueInput('postBinaryStl', 'Convert ASCII STL to binary', True, '', False)
+            binaryStlInput.tooltip = 'Rewrite ASCII STL exports as binary STL'
+            
+            validateInput = postInputs.addBoolValueInput('postValidate', 'Validate STL meshes', True, '', False)
+            validateInput.tooltip = ('Check every STL for triangle count, open and non-manifold edges and volume; '
+                                     'failures are listed in the summary and statistics go to the manifest')
+            
+            openEdgesInput = postInputs.addIntegerSpinnerCommandInput('postMaxOpenEdges', 'Allowed open edges', 0, 100000, 1, 0)
+            openEdgesInput.tooltip = 'STL files with more open (boundary) edges than this fail validation'
+            
+            gzipInput = postInputs.addBoolValueInput('postGzip', 'Compress files (.gz)', True, '', False)
+            gzipInput.tooltip = 'Replace each export with a gzip-compressed copy'
+            
+            copyToInput = postInputs.addStringValueInput('postCopyTo', 'Copy to folder', '')
+            copyToInput.tooltip = 'Optional second folder (for example a network share) that every finished file is copied to'
+            
+            # 10. Export farm
+            farmGroup = inputs.addGroupCommandInput('farmGroup', 'Export Farm')
+            farmGroup.isExpanded = False
+            farmGroup.isEnabledCheckBoxDisplayed = False
+            farmInputs = farmGroup.children
+            
+            farmInput = farmInputs.addBoolValueInput('farmMode', 'Share this sweep with other Fusion windows', True, '', False)
+            farmInput.tooltip = (f'Split the variations into chunks in {job_queue.QUEUE_FILE} in the output folder. '
+                                 'Start the script with the same settings in more Fusion windows on the same design; '
+                                 'each window claims chunks until none are left and the last one merges the manifests.')
+            
+            chunkInput = farmInputs.addIntegerSpinnerCommandInput('farmChunk', 'Variations per chunk', 1, 10000, 1, 10)
+            chunkInput.tooltip = 'Smaller chunks share the work more evenly; larger chunks mean fewer queue round trips'
+            
             # Connect input changed handler
             onInputChanged = MyInputChangedHandler()
             cmd.inputChanged.add(onInputChanged)
@@ -266,13 +917,52 @@ class MyInputChangedHandler(adsk.core.InputChangedEventHandler):
                     self.isResetting = True
                     input.value = False
             
+            # Filter the component list
+            elif input.id == 'compFilter':
+                compGroup = inputs.itemById('compGroup')
+                if compGroup and entityIndex:
+                    show_component_matches(compGroup.children, entityIndex, input.value)
+            
+            # Select or clear every component matching the filter, listed or not
+            elif input.id in ('compSelectMatching', 'compClearSelection'):
+                if self.isResetting:
+                    self.isResetting = False
+                    return
+                
+                compGroup = inputs.itemById('compGroup')
+                if input.value and compGroup and entityIndex:
+                    compInputs = compGroup.children
+                    select = input.id == 'compSelectMatching'
+                    entries = entityIndex.matching('comp', compInputs.itemById('compFilter').value) if select else entityIndex.of_kind('comp')
+                    for entry in entries:
+                        entry.selected = select
+                    for entry in entityIndex.of_kind('comp'):
+                        if entry.listed:
+                            compInputs.itemById(entry.inputId).value = entry.selected
+                    show_component_matches(compInputs, entityIndex, compInputs.itemById('compFilter').value)
+                    
+                    self.isResetting = True
+                    input.value = False
+            
+            # Object checkboxes
+            elif entityIndex and input.id in entityIndex.byId:
+                entry = entityIndex.byId[input.id]
+                entry.selected = input.value
+                if entry.kind == 'comp':
+                    compInputs = inputs.itemById('compGroup').children
+                    update_component_info(compInputs, entityIndex,
+                                          len(entityIndex.matching('comp', compInputs.itemById('compFilter').value)))
+            
             # Show/hide mesh options based on format selection
             elif input.id == 'exportFormat':
                 formatGroup = inputs.itemById('formatGroup')
                 if formatGroup:
                     stlLabel = formatGroup.children.itemById('stlLabel')
                     meshRefinement = formatGroup.children.itemById('meshRefinement')
+                    adaptiveInput = formatGroup.children.itemById('adaptiveMesh')
+                    meshTargetInput = formatGroup.children.itemById('meshTarget')
                     unitDropdown = formatGroup.children.itemById('exportUnit')
+                    combineInput = formatGroup.children.itemById('combineObjects')
                     formatDropdown = formatGroup.children.itemById('exportFormat')
                     
                     if formatDropdown:
@@ -284,8 +974,14 @@ class MyInputChangedHandler(adsk.core.InputChangedEventHandler):
                             stlLabel.isVisible = showMeshOptions
                         if meshRefinement:
                             meshRefinement.isVisible = showMeshOptions
+                        if adaptiveInput:
+                            adaptiveInput.isVisible = showMeshOptions
+                        if meshTargetInput:
+                            meshTargetInput.isVisible = showMeshOptions
                         if unitDropdown:
                             unitDropdown.isVisible = showUnitOptions
+                        if combineInput:
+                            combineInput.isVisible = showMeshOptions
                     
         except:
             pass
@@ -313,19 +1009,69 @@ class MyCommandExecuteHandler(adsk.core.CommandEventHandler):
                 ui.messageBox('Parameter not found')
                 return
             
-            originalExpression = userParam.expression
-            
             # Get parameter type
             paramType = inputs.itemById('paramType')
             isTextParam = paramType.selectedItem.index == 0
             
-            # Get variations
-            variationsInput = inputs.itemById('variations')
-            variations = [v.strip() for v in variationsInput.text.split(',') if v.strip()]
+            # Relative '@file' variation sources are read from the output folder
+            folderGroup = inputs.itemById('folderGroup')
+            baseFolder = folderGroup.children.itemById('outputFolder').text if folderGroup else None
             
-            if not variations:
-                ui.messageBox('No variations entered')
-                return
+            # A variation table replaces the parameter, variations and additional parameters
+            sweepGroup = inputs.itemById('sweepGroup')
+            variationTable = None
+            tableText = sweepGroup.children.itemById('variationTable').value.strip() if sweepGroup else ''
+            if tableText:
+                try:
+                    variationTable = batch_core.open_variation_table(tableText, baseFolder)
+                    sweepAxes = table_sweep_axes(design, variationTable)
+                except (ValueError, OSError) as e:
+                    ui.messageBox(f'Invalid variation table:\n{e}')
+                    return
+                zipMode = False
+            else:
+                # Get variations
+                variationsInput = inputs.itemById('variations')
+                try:
+                    variations = batch_core.parse_variations(variationsInput.text, isTextParam, baseFolder)
+                except (ValueError, OSError) as e:
+                    ui.messageBox(f'Invalid variations:\n{e}')
+                    return
+                
+                if not variations:
+                    ui.messageBox('No variations entered')
+                    return
+                
+                # Build sweep axes
+                sweepAxes = [batch_core.SweepAxis(paramName, variations, isTextParam, userParam.expression, userParam)]
+                
+                zipMode = False
+                if sweepGroup:
+                    zipMode = sweepGroup.children.itemById('sweepMode').selectedItem.index == 1
+                    try:
+                        extraParams = batch_core.parse_extra_params(sweepGroup.children.itemById('extraParams').text)
+                    except ValueError as e:
+                        ui.messageBox(str(e))
+                        return
+                
+                    for extraName, extraText in extraParams:
+                        extraParam = design.userParameters.itemByName(extraName)
+                        if not extraParam:
+                            ui.messageBox(f'Parameter not found: {extraName}')
+                            return
+                        extraIsText = is_text_parameter(extraParam)
+                        try:
+                            extraValues = batch_core.parse_variations(extraText, extraIsText, baseFolder)
+                        except (ValueError, OSError) as e:
+                            ui.messageBox(f'Invalid variations for {extraName}:\n{e}')
+                            return
+                        if not extraValues:
+                            ui.messageBox(f'No variations entered for {extraName}')
+                            return
+                        if any(extraName == axis.name for axis in sweepAxes):
+                            ui.messageBox(f'Parameter listed twice: {extraName}')
+                            return
+                        sweepAxes.append(batch_core.SweepAxis(extraName, extraValues, extraIsText, extraParam.expression, extraParam))
             
             # Get naming options
             namingGroup = inputs.itemById('namingGroup')
@@ -333,6 +1079,7 @@ class MyCommandExecuteHandler(adsk.core.CommandEventHandler):
             suffix = namingGroup.children.itemById('fileSuffix').value if namingGroup else ''
             addNumbering = namingGroup.children.itemById('addNumbering').value if namingGroup else False
             includeParamName = namingGroup.children.itemById('includeParamName').value if namingGroup else False
+            filenameTemplate = namingGroup.children.itemById('filenameTemplate').value.strip() if namingGroup else ''
             
             # Get export format
             formatGroup = inputs.itemById('formatGroup')
@@ -343,65 +1090,61 @@ class MyCommandExecuteHandler(adsk.core.CommandEventHandler):
             unitDropdown = formatGroup.children.itemById('exportUnit')
             selectedUnit = unitDropdown.selectedItem.name
             
-            # Map unit selection to MeshUnits enum (FIXED)
-            unitMap = {
-                'Millimeters': adsk.fusion.MeshUnits.MillimeterMeshUnit,
-                'Centimeters': adsk.fusion.MeshUnits.CentimeterMeshUnit,
-                'Meters': adsk.fusion.MeshUnits.MeterMeshUnit,
-                'Inches': adsk.fusion.MeshUnits.InchMeshUnit,
-                'Feet': adsk.fusion.MeshUnits.FootMeshUnit
-            }
-            exportUnit = unitMap.get(selectedUnit, adsk.fusion.MeshUnits.MillimeterMeshUnit)
-            
             # Get mesh refinement options if applicable
-            meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
-            if 'STL' in selectedFormat or '3MF' in selectedFormat or 'OBJ' in selectedFormat:
+            meshRefinement = 'Medium'
+            if batch_core.is_mesh_format(selectedFormat):
                 meshDropdown = formatGroup.children.itemById('meshRefinement')
                 if meshDropdown:
-                    meshSelection = meshDropdown.selectedItem.name
-                    if meshSelection == 'Low':
-                        meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementLow
-                    elif meshSelection == 'High':
-                        meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementHigh
-            
-            # Determine file extension
-            if 'STL' in selectedFormat:
-                fileExt = '.stl'
-            elif '3MF' in selectedFormat:
-                fileExt = '.3mf'
-            elif 'OBJ' in selectedFormat:
-                fileExt = '.obj'
-            elif 'STEP' in selectedFormat:
-                fileExt = '.step'
-            elif 'F3D' in selectedFormat:
-                fileExt = '.f3d'
-            else:
-                fileExt = '.stl'
+                    meshRefinement = meshDropdown.selectedItem.name
             
-            # Get selected export objects
-            selectedObjects = []
-            rootComp = design.rootComponent
+            # Get additional formats
+            extraDropdown = formatGroup.children.itemById('extraFormats')
+            extraFormats = [item.name for item in extraDropdown.listItems if item.isSelected] if extraDropdown else []
+            tessellateInput = formatGroup.children.itemById('tessellateOnce')
+            tessellateOnce = tessellateInput is not None and tessellateInput.value
+            if extraFormats or tessellateOnce:
+                meshDropdown = formatGroup.children.itemById('meshRefinement')
+                if meshDropdown:
+                    meshRefinement = meshDropdown.selectedItem.name
             
-            bodyGroup = inputs.itemById('bodyGroup')
-            if bodyGroup:
-                for body in rootComp.bRepBodies:
-                    safe_id = sanitize_id(body.name)
-                    boolInput = bodyGroup.children.itemById(f'body_{safe_id}')
-                    if boolInput and boolInput.value:
-                        selectedObjects.append((body.name, body))
-            
-            compGroup = inputs.itemById('compGroup')
-            if compGroup:
-                for occ in rootComp.allOccurrences:
-                    safe_id = sanitize_id(occ.name)
-                    boolInput = compGroup.children.itemById(f'comp_{safe_id}')
-                    if boolInput and boolInput.value:
-                        selectedObjects.append((occ.name, occ))
+            # Adaptive refinement applies to the mesh formats, also when they are only extra formats
+            adaptiveInput = formatGroup.children.itemById('adaptiveMesh')
+            adaptiveMesh = batch_core.ADAPTIVE_MODES[adaptiveInput.selectedItem.name] if adaptiveInput else ''
+            meshTargetInput = formatGroup.children.itemById('meshTarget')
+            meshTarget = meshTargetInput.value if meshTargetInput else 0
+            
+            # Get compute timeout
+            computeGroup = inputs.itemById('computeGroup')
+            computeTimeout = computeGroup.children.itemById('computeTimeout').value if computeGroup else 30.0
+            fastMode = computeGroup.children.itemById('fastMode').value if computeGroup else False
+            selectiveCompute = computeGroup.children.itemById('selectiveCompute').value if computeGroup else False
+            
+            # Get selected export objects from the index the dialog was built from
+            rootComp = design.rootComponent
+            index = get_entity_index(design)
+            groups = {'body': inputs.itemById('bodyGroup'), 'comp': inputs.itemById('compGroup')}
+            for entry in index.entries:
+                # Listed objects take their checkbox state; unlisted ones keep what select-all set
+                if entry.listed and groups[entry.kind]:
+                    boolInput = groups[entry.kind].children.itemById(entry.inputId)
+                    if boolInput:
+                        entry.selected = boolInput.value
+            selectedObjects = [(entry.displayName, entry.entity) for entry in index.selected_entries()]
             
             if not selectedObjects:
                 ui.messageBox('No objects selected for export')
                 return
             
+            # Units of work: one file per unit and variation
+            combineInput = formatGroup.children.itemById('combineObjects')
+            combineObjects = (combineInput is not None and combineInput.value and len(selectedObjects) > 1
+                              and batch_core.is_mesh_format(selectedFormat))
+            if combineObjects:
+                # The root component is exported with everything else hidden
+                exportUnits = [batch_core.ExportUnit('All objects', rootComp, [objEntity for objName, objEntity in selectedObjects])]
+            else:
+                exportUnits = [batch_core.ExportUnit(objName, objEntity) for objName, objEntity in selectedObjects]
+            
             # Get output folder
             folderGroup = inputs.itemById('folderGroup')
             if not folderGroup:
@@ -418,146 +1161,208 @@ class MyCommandExecuteHandler(adsk.core.CommandEventHandler):
                 ui.messageBox('Please select a valid output folder')
                 return
             
+            reuseInput = folderGroup.children.itemById('reuseDuplicates')
+            runModeInput = folderGroup.children.itemById('runMode')
+            archiveInput = folderGroup.children.itemById('archiveMode')
+            archiveFormat = batch_core.ARCHIVE_MODES[archiveInput.selectedItem.name] if archiveInput else ''
+            estimateInput = folderGroup.children.itemById('estimateFirst')
+            estimateFirst = estimateInput is not None and estimateInput.value
+            samplesInput = folderGroup.children.itemById('estimateSamples')
+            estimateSamples = samplesInput.value if samplesInput else 3
+            retryInput = folderGroup.children.itemById('retryAttempts')
+            retryFactorInput = folderGroup.children.itemById('retryTimeoutFactor')
+            retryRefinementInput = folderGroup.children.itemById('retryLowerRefinement')
+            retryPolicy = batch_core.RetryPolicy(
+                attempts=retryInput.value if retryInput else 0,
+                timeoutFactor=retryFactorInput.value if retryFactorInput else 2.0,
+                lowerRefinement=retryRefinementInput is not None and retryRefinementInput.value)
+            
+            # Get post-processing options
+            postGroup = inputs.itemById('postGroup')
+            postWorkers = postGroup.children.itemById('postWorkers').value if postGroup else 0
+            binaryStl = postGroup.children.itemById('postBinaryStl').value if postGroup else False
+            gzipOutput = postGroup.children.itemById('postGzip').value if postGroup else False
+            validateMeshes = postGroup.children.itemById('postValidate').value if postGroup else False
+            maxOpenEdges = postGroup.children.itemById('postMaxOpenEdges').value if postGroup else 0
+            copyToFolder = postGroup.children.itemById('postCopyTo').value.strip() if postGroup else ''
+            if copyToFolder and not os.path.isdir(copyToFolder):
+                ui.messageBox(f'Copy-to folder does not exist:\n{copyToFolder}')
+                return
+            
+            # Get export farm options
+            farmGroup = inputs.itemById('farmGroup')
+            farmMode = farmGroup.children.itemById('farmMode').value if farmGroup else False
+            farmChunk = farmGroup.children.itemById('farmChunk').value if farmGroup else 10
+            
+            try:
+                config = batch_core.BatchConfig(
+                    sweepAxes,
+                    outputFolder,
+                    selectedFormat=selectedFormat,
+                    selectedUnit=selectedUnit,
+                    meshRefinement=meshRefinement,
+                    zipMode=zipMode,
+                    prefix=prefix,
+                    suffix=suffix,
+                    addNumbering=addNumbering,
+                    includeParamName=includeParamName,
+                    computeTimeout=computeTimeout,
+                    reuseDuplicates=reuseInput is not None and reuseInput.value,
+                    runMode=runModeInput.selectedItem.index if runModeInput else batch_core.RUN_EXPORT_ALL,
+                    combineObjects=combineObjects,
+                    fastMode=fastMode,
+                    postprocessWorkers=postWorkers,
+                    binaryStl=binaryStl,
+                    gzipOutput=gzipOutput,
+                    copyToFolder=copyToFolder,
+                    extraFormats=extraFormats,
+                    tessellateOnce=tessellateOnce,
+                    validateMeshes=validateMeshes,
+                    maxOpenEdges=maxOpenEdges,
+                    workerId=job_queue.worker_name() if farmMode else '',
+                    filenameTemplate=filenameTemplate,
+                    archiveFormat=archiveFormat,
+                    selectiveCompute=selectiveCompute,
+                    adaptiveMesh=adaptiveMesh,
+                    meshTarget=meshTarget,
+                    retryPolicy=retryPolicy,
+                    variationTable=variationTable
+                )
+            except ValueError as e:
+                ui.messageBox(str(e))
+                return
+            backend = FusionBackend(app, design, selectedObjects, [entry.entity for entry in index.of_kind('comp')])
+            executor = batch_core.BatchExecutor(config, backend)
+            combinationCount = config.combination_count()
+            
+            # Build every filename before exporting so template mistakes and unknown table objects show up now
+            try:
+                collisions = executor.prepare_names(exportUnits)
+                totalOperations = executor.total_operations(exportUnits)
+            except ValueError as e:
+                ui.messageBox(str(e))
+                return
+            
+            # Dry run: time a few sample variations before committing to the whole sweep
+            costModel = batch_core.CostModel()
+            costKey = batch_core.CostModel.key(config, exportUnits, design.rootComponent.name)
+            sampleResult = None
+            if estimateFirst:
+                sampleFiles = min(estimateSamples, combinationCount) * len(exportUnits) * len(config.formats)
+                progressDialog = ui.createProgressDialog()
+                progressDialog.cancelButtonText = 'Cancel'
+                progressDialog.isCancelButtonShown = True
+                progressDialog.show('Batch Export', 'Sampling %v of %m', 0, sampleFiles)
+                executor.progress = FusionProgress(progressDialog)
+                try:
+                    sampleResult = executor.sample(exportUnits, estimateSamples)
+                except ValueError as e:
+                    ui.messageBox(f'Dry run failed, nothing was exported:\n\n{e}')
+                    return
+                finally:
+                    progressDialog.hide()
+                costModel.record(costKey, sampleResult)
+                try:
+                    costModel.save()
+                except OSError:
+                    pass
+            estimate = costModel.estimate(costKey, combinationCount, totalOperations)
+            
             # Confirm
             confirmMsg = f'Ready to export:\n\n'
-            confirmMsg += f'Parameter: {paramName}\n'
-            confirmMsg += f'Type: {"Text" if isTextParam else "Numeric"}\n'
-            confirmMsg += f'Format: {selectedFormat}\n'
+            if variationTable:
+                confirmMsg += f'Variation table: {os.path.basename(variationTable.path)} ({len(variationTable)} rows'
+                confirmMsg += f'{", filenames per row" if variationTable.hasFilenames else ""}{", objects per row" if variationTable.hasObjects else ""})\n'
+            for axis in sweepAxes:
+                confirmMsg += f'Parameter: {axis.name} ({"Text" if axis.isText else "Numeric"}, {len(axis.values)} values)\n'
+            if len(sweepAxes) > 1 and not variationTable:
+                confirmMsg += f'Combine: {"Zip" if zipMode else "All combinations"}\n'
+            confirmMsg += f'Format: {", ".join(config.formats)}{" (tessellated once)" if tessellateOnce else ""}\n'
+            if adaptiveMesh:
+                confirmMsg += f'Mesh: adaptive, {adaptiveInput.selectedItem.name}{f" {meshTarget}" if meshTarget and adaptiveMesh != batch_core.ADAPTIVE_BOUNDS else ""}\n'
             confirmMsg += f'Unit: {selectedUnit}\n'
-            confirmMsg += f'Variations: {len(variations)}\n'
-            confirmMsg += f'Objects: {len(selectedObjects)}\n'
-            confirmMsg += f'Total files: {len(variations) * len(selectedObjects)}\n\n'
+            confirmMsg += f'Variations: {combinationCount}\n'
+            confirmMsg += f'Objects: {len(selectedObjects)}{" (combined into one file)" if combineObjects else ""}\n'
+            confirmMsg += f'Total files: {totalOperations}\n'
+            if collisions:
+                confirmMsg += f'\nWarning: {len(collisions)} filename(s) collide and will get _2, _3, ... appended, e.g.\n'
+                confirmMsg += ''.join(f'  {filename}\n' for filename in collisions[:5])
+            if estimate:
+                seconds, diskBytes, runs = estimate
+                if sampleResult:
+                    source = f'{sampleResult.exportedVariants} sampled variation(s){" and earlier runs" if runs > 1 else ""}'
+                else:
+                    source = f'{runs} earlier run(s)'
+                confirmMsg += f'Estimated time: {batch_core.format_duration(seconds)}{" in one window" if farmMode else ""} (from {source})\n'
+                confirmMsg += f'Estimated disk use: {batch_core.format_size(diskBytes)}\n'
+            if archiveFormat:
+                confirmMsg += f'Output: {archiveInput.selectedItem.name}{" (one per window)" if farmMode else ""}\n'
+            if farmMode:
+                confirmMsg += f'Farm: shared with other windows in chunks of {farmChunk} variations\n'
+            confirmMsg += '\n'
             confirmMsg += 'Continue?'
             
             if ui.messageBox(confirmMsg, 'Confirm', adsk.core.MessageBoxButtonTypes.YesNoButtonType) != adsk.core.DialogResults.DialogYes:
                 return
             
             # Progress dialog
-            totalOperations = len(variations) * len(selectedObjects)
             progressDialog = ui.createProgressDialog()
             progressDialog.cancelButtonText = 'Cancel'
             progressDialog.isBackgroundTranslucent = False
             progressDialog.isCancelButtonShown = True
             progressDialog.show('Batch Export', 'Exporting %v of %m', 0, totalOperations)
             
-            # Export
-            exportMgr = design.exportManager
-            successCount = 0
-            currentProgress = 0
-            
-            for variantIdx, variant in enumerate(variations):
-                if progressDialog.wasCancelled:
-                    break
-                
+            # Join (or create) the shared queue; this window then runs whichever chunks it claims
+            queue = None
+            claims = None
+            if farmMode:
+                queue = job_queue.JobQueue(outputFolder)
                 try:
-                    # Update parameter
-                    if isTextParam:
-                        newExpression = "'{}'".format(variant.replace("'", "\\'"))
-                    else:
-                        newExpression = str(variant)
-                    
-                    userParam.expression = newExpression
-                    
-                    # OPTIMIZED: Simplified regeneration
-                    try:
-                        design.computeAll()
-                    except:
-                        pass
-                    
-                    # Wait for compute
-                    for _ in range(100):
-                        adsk.doEvents()
-                    
-                    # Single viewport refresh
-                    app.activeViewport.refresh()
-                    
-                    # Export each object
-                    for objName, objEntity in selectedObjects:
-                        if progressDialog.wasCancelled:
-                            break
-                        
-                        currentProgress += 1
-                        progressDialog.progressValue = currentProgress
-                        progressDialog.message = f'Exporting: {variant} - {objName}'
-                        
-                        try:
-                            # Build filename
-                            safeVariant = "".join(c for c in variant if c.isalnum() or c in (' ', '-', '_', '.')).strip() or f'variant_{variantIdx+1}'
-                            safeObj = "".join(c for c in objName if c.isalnum() or c in (' ', '-', '_', '.')).strip()
-                            
-                            filenameParts = []
-                            
-                            if prefix:
-                                filenameParts.append(prefix)
-                            
-                            if addNumbering:
-                                filenameParts.append(f'{variantIdx+1:03d}')
-                            
-                            if includeParamName:
-                                filenameParts.append(paramName)
-                            
-                            filenameParts.append(safeVariant)
-                            
-                            if len(selectedObjects) > 1:
-                                filenameParts.append(safeObj)
-                            
-                            if suffix:
-                                filenameParts.append(suffix)
-                            
-                            filename = '_'.join(filenameParts) + fileExt
-                            fullPath = os.path.join(outputFolder, filename)
-                            
-                            # Export based on format with selected unit
-                            if 'STL' in selectedFormat:
-                                stlOpts = exportMgr.createSTLExportOptions(objEntity, fullPath)
-                                stlOpts.isBinaryFormat = 'Binary' in selectedFormat
-                                stlOpts.meshRefinement = meshRefinement
-                                stlOpts.sendToPrintUtility = False
-                                stlOpts.unit = exportUnit
-                                exportMgr.execute(stlOpts)
-                                
-                            elif '3MF' in selectedFormat:
-                                mfOpts = exportMgr.createC3MFExportOptions(objEntity, fullPath)
-                                mfOpts.meshRefinement = meshRefinement
-                                # 3MF uses millimeters by default
-                                exportMgr.execute(mfOpts)
-                                
-                            elif 'OBJ' in selectedFormat:
-                                objOpts = exportMgr.createOBJExportOptions(objEntity, fullPath)
-                                objOpts.meshRefinement = meshRefinement
-                                objOpts.unit = exportUnit
-                                exportMgr.execute(objOpts)
-                                
-                            elif 'STEP' in selectedFormat:
-                                stepOpts = exportMgr.createSTEPExportOptions(fullPath, objEntity)
-                                exportMgr.execute(stepOpts)
-                                
-                            elif 'F3D' in selectedFormat:
-                                f3dOpts = exportMgr.createFusionArchiveExportOptions(fullPath)
-                                exportMgr.execute(f3dOpts)
-                            
-                            successCount += 1
-                            
-                        except Exception as e:
-                            pass
-                            
-                except:
-                    currentProgress += len(selectedObjects)
+                    queue.prepare(job_queue.plan_signature(config, exportUnits), combinationCount, farmChunk)
+                except ValueError as e:
+                    progressDialog.hide()
+                    queue.close()
+                    ui.messageBox(str(e))
+                    return
             
-            # Restore parameter
+            # Export; the queue is closed however the run ends
+            executor.progress = FusionProgress(progressDialog)
             try:
-                userParam.expression = originalExpression
+                if queue:
+                    queue.register(config.workerId)
+                    claims = job_queue.iter_claims(queue, config.workerId)
                 try:
-                    design.computeAll()
-                except:
-                    pass
-                adsk.doEvents()
-            except:
-                pass
-            
-            progressDialog.hide()
-            
-            ui.messageBox(f'Done!\n\nExported {successCount} of {totalOperations} files')
+                    result = executor.run(exportUnits, claims)
+                finally:
+                    progressDialog.hide()
+                    if queue:
+                        claims.close()
+                        queue.unregister(config.workerId)
+                
+                # Actual costs make the next estimate better
+                if costModel.record(costKey, result):
+                    try:
+                        costModel.save()
+                    except OSError:
+                        pass
+                
+                summary = result.summary(config, len(selectedObjects) if combineObjects else 1)
+                if queue:
+                    if queue.try_start_merge():
+                        merged = job_queue.merge_worker_files(outputFolder)
+                        job_queue.merge_worker_files(outputFolder, batch_core.FAILURES_FILE)
+                        stillFailing = job_queue.merge_worker_files(outputFolder, batch_core.FAILED_JOB_FILE, replace=True)
+                        summary += f'\n\n{queue.summary()}\nMerged {merged} manifest entries into {batch_core.MANIFEST_FILE}'
+                        if stillFailing:
+                            summary += f'\n{stillFailing} variation(s) with failed files merged into {batch_core.FAILED_JOB_FILE}'
+                    else:
+                        counts = queue.counts()
+                        summary += (f"\n\nFarm: {counts.get('done', 0)} of {sum(counts.values())} chunks done; "
+                                    'the last window to finish merges the manifests')
+            finally:
+                if queue:
+                    queue.close()
+            ui.messageBox(summary)
             
         except:
             app = adsk.core.Application.get()
@@ -0,0 +1,150 @@
+"""Archive output for the batch parameter export.
+
+Finished files are streamed into a single ZIP (deflate) or tar.zst archive
+by a background thread and deleted as soon as they are in it, so the disk
+only ever holds a few loose files. ArchiveWriter.add blocks while the
+writer thread is behind, which bounds the staged files; errors are
+collected in ArchiveWriter.errors instead of raised. zstandard is
+optional; without it only ZIP is offered.
+"""
+import hashlib
+import io
+import json
+import os
+import queue
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_ZIP = 'zip'
+ARCHIVE_TAR_ZST = 'tar.zst'
+INDEX_NAME = 'batch_index.json'
+
+
+def archive_kinds():
+    """Archive kinds this Python can write"""
+    return [ARCHIVE_ZIP, ARCHIVE_TAR_ZST] if zstandard is not None else [ARCHIVE_ZIP]
+
+
+def archive_extension(kind):
+    return '.tar.zst' if kind == ARCHIVE_TAR_ZST else '.zip'
+
+
+class HashingReader:
+    """File wrapper that hashes everything read through it"""
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+    
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.digest.update(data)
+        return data
+
+
+class ArchiveWriter:
+    """Streams files into one archive from a background thread.
+    
+    add() queues a finished file and blocks while maxPending files are
+    already waiting, which bounds the loose files on disk. Each file is
+    deleted once it is in the archive. Duplicates can be added as aliases:
+    tar stores them as hard links, ZIP only lists them in the index. The
+    index (name, size, sha256 and alias target per entry) is written as
+    the last archive member.
+    """
+    def __init__(self, path, kind=ARCHIVE_ZIP, maxPending=8, level=6):
+        self.path = path
+        self.kind = kind
+        self.index = []
+        self.errors = []
+        self.pending = queue.Queue(maxsize=max(1, maxPending))
+        
+        if kind == ARCHIVE_TAR_ZST:
+            if zstandard is None:
+                raise ValueError('tar.zst archives need the zstandard package')
+            self.stream = zstandard.ZstdCompressor(level=level).stream_writer(open(path, 'wb'))
+            self.archive = tarfile.open(fileobj=self.stream, mode='w|')
+        else:
+            self.stream = None
+            self.archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=level)
+        
+        self.thread = threading.Thread(target=self._run, name='archive-writer', daemon=True)
+        self.thread.start()
+    
+    def add(self, name, path):
+        """Queue a file for the archive; returns the seconds spent waiting for a free slot"""
+        start = time.perf_counter()
+        self.pending.put((name, path, None))
+        return time.perf_counter() - start
+    
+    def add_alias(self, name, target):
+        """Queue an entry with the same content as an earlier one"""
+        start = time.perf_counter()
+        self.pending.put((name, None, target))
+        return time.perf_counter() - start
+    
+    def _run(self):
+        records = {}
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            name, path, target = item
+            try:
+                if target is None:
+                    records[name] = self._write_file(name, path)
+                else:
+                    records[name] = self._write_alias(name, target, records)
+                self.index.append(records[name])
+            except Exception as e:
+                self.errors.append((name, f'{type(e).__name__}: {e}'))
+    
+    def _write_file(self, name, path):
+        size = os.path.getsize(path)
+        with open(path, 'rb') as src:
+            reader = HashingReader(src)
+            if self.kind == ARCHIVE_TAR_ZST:
+                info = tarfile.TarInfo(name)
+                info.size = size
+                info.mtime = os.path.getmtime(path)
+                self.archive.addfile(info, reader)
+            else:
+                info = zipfile.ZipInfo.from_file(path, name)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with self.archive.open(info, 'w') as dst:
+                    shutil.copyfileobj(reader, dst, 1024 * 1024)
+        os.remove(path)
+        return {'name': name, 'size': size, 'sha256': reader.digest.hexdigest()}
+    
+    def _write_alias(self, name, target, records):
+        if target not in records:
+            raise ValueError(f'alias target {target} is not in the archive')
+        if self.kind == ARCHIVE_TAR_ZST:
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.LNKTYPE
+            info.linkname = target
+            self.archive.addfile(info)
+        return dict(records[target], name=name, sameAs=target)
+    
+    def close(self):
+        """Finish the queued files, write the index and close the archive"""
+        self.pending.put(None)
+        self.thread.join()
+        data = json.dumps({'entries': self.index, 'errors': self.errors}, indent=1).encode('utf-8')
+        if self.kind == ARCHIVE_TAR_ZST:
+            info = tarfile.TarInfo(INDEX_NAME)
+            info.size = len(data)
+            info.mtime = time.time()
+            self.archive.addfile(info, io.BytesIO(data))
+            self.archive.close()
+            self.stream.close()
+        else:
+            self.archive.writestr(INDEX_NAME, data)
+            self.archive.close()
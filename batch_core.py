@@ -0,0 +1,2406 @@
+"""Fusion-independent core of the batch parameter export.
+
+Everything in this module is plain Python: variation parsing, sweeps,
+filenames, the geometry cache, the manifest and the export loop itself.
+All calls into Fusion go through an ExportBackend, so the same loop can
+run against SimulatedBackend on any machine for profiling and benchmarks.
+"""
+import bisect
+import concurrent.futures
+import copy
+import csv
+import gzip
+import hashlib
+import itertools
+import json
+import math
+from array import array
+import os
+import random
+import re
+import shutil
+import string
+import sys
+import tempfile
+import time
+import traceback
+
+try:
+    from . import archive_io, mesh_io
+except ImportError:
+    import archive_io
+    import mesh_io
+
+# Export formats as shown in the dialog
+FORMATS = ['STL (Binary)', 'STL (ASCII)', '3MF (with color)', 'OBJ (with color)', 'STEP', 'F3D (Archive)']
+UNITS = ['Millimeters', 'Centimeters', 'Meters', 'Inches', 'Feet']
+REFINEMENTS = ['Low', 'Medium', 'High']
+
+# Run modes, by dropdown index
+RUN_MODES = ['Export everything', 'Resume (skip completed files)', 'Rebuild changed only', 'Retry failed files only']
+RUN_EXPORT_ALL = 0
+RUN_RESUME = 1
+RUN_REBUILD_CHANGED = 2
+RUN_RETRY_FAILED = 3
+
+# Adaptive mesh refinement modes, as shown in the dialog
+ADAPTIVE_BOUNDS = 'bounds'
+ADAPTIVE_TRIANGLES = 'triangles'
+ADAPTIVE_FILE_SIZE = 'size'
+ADAPTIVE_MODES = {'Off': '', 'Scale to object size': ADAPTIVE_BOUNDS,
+                  'Target triangle count': ADAPTIVE_TRIANGLES, 'Target file size (KB)': ADAPTIVE_FILE_SIZE}
+
+# Starting point of adaptive refinement: surface deviation as a fraction
+# of the bounding box diagonal, and normal deviation in degrees
+ADAPTIVE_REFINEMENT = {'Low': (1 / 500, 30.0), 'Medium': (1 / 2000, 15.0), 'High': (1 / 8000, 7.5)}
+
+# How a variation was recomputed
+COMPUTE_FULL = 'full'
+COMPUTE_INCREMENTAL = 'incremental'
+
+# Output modes as shown in the dialog, mapped to archive kinds
+ARCHIVE_MODES = {'Loose files': '', 'ZIP archive': archive_io.ARCHIVE_ZIP, 'tar.zst archive': archive_io.ARCHIVE_TAR_ZST}
+
+GEOMETRY_CACHE_FILE = '.batch_export_cache.json'
+MESH_SETTINGS_FILE = '.batch_mesh_settings.json'
+MANIFEST_FILE = 'batch_manifest.jsonl'
+FAILURES_FILE = 'batch_failures.jsonl'
+FAILED_JOB_FILE = 'batch_failed.jsonl'
+TIMING_CSV_FILE = 'batch_timing.csv'
+TIMING_JSON_FILE = 'batch_timing.json'
+ARCHIVE_STAGING_FOLDER = '.batch_staging'
+
+# Measured export costs, kept between runs and designs
+COST_MODEL_FILE = os.path.join(os.path.expanduser('~'), '.mass_parameter_export_costs.json')
+
+# Fields a filename template may use besides the names of the swept parameters
+TEMPLATE_FIELDS = ['prefix', 'suffix', 'n', 'param', 'value', 'values', 'object', 'ext']
+
+# Variation table columns that are not user parameters
+TABLE_FILENAME_COLUMN = '_filename'
+TABLE_OBJECTS_COLUMN = '_objects'
+TABLE_JSON_EXTENSIONS = ('.jsonl', '.ndjson', '.json')
+
+# Characters no filename may contain on Windows, macOS or Linux
+INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+# Stages of the export loop, in the order they run
+# Sanitized values remembered per axis; table columns have a new value on nearly every row
+SAFE_VALUE_CACHE_SIZE = 1024
+# Size of the filter that finds repeated filenames before a run (1 MB)
+FILENAME_FILTER_BITS = 1 << 23
+# Samples kept per stage for the timing percentiles; counts, totals and maxima are exact
+TIMING_RESERVOIR_SIZE = 2048
+STAGES = ['parameters', 'compute', 'wait', 'refresh', 'fingerprint', 'refine', 'tessellate', 'export', 'reuse', 'backpressure', 'manifest', 'archive']
+
+
+def is_mesh_format(selectedFormat):
+    """True for formats that are tessellated on export"""
+    return 'STL' in selectedFormat or '3MF' in selectedFormat or 'OBJ' in selectedFormat
+
+
+def worker_file(filename, workerId=''):
+    """Per-worker name of a shared output file ('batch_manifest.jsonl' -> 'batch_manifest.<worker>.jsonl')"""
+    if not workerId:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}.{workerId}{ext}'
+
+
+def worker_files(outputFolder, filename):
+    """Existing per-worker shards of a shared output file"""
+    stem, ext = os.path.splitext(filename)
+    try:
+        names = os.listdir(outputFolder)
+    except OSError:
+        return []
+    return sorted(name for name in names if name.startswith(stem + '.') and name.endswith(ext) and name != filename)
+
+
+def file_extension(selectedFormat):
+    """File extension for an export format"""
+    if 'STL' in selectedFormat:
+        return '.stl'
+    elif '3MF' in selectedFormat:
+        return '.3mf'
+    elif 'OBJ' in selectedFormat:
+        return '.obj'
+    elif 'STEP' in selectedFormat:
+        return '.step'
+    elif 'F3D' in selectedFormat:
+        return '.f3d'
+    return '.stl'
+
+
+def sanitize_id(name):
+    """Convert name to valid ID by removing invalid characters"""
+    safe_id = re.sub(r'[^a-zA-Z0-9_]', '_', name)
+    if not safe_id[0].isalpha():
+        safe_id = 'obj_' + safe_id
+    return safe_id
+
+
+def sanitize_filename(text):
+    """Keep only characters that are safe in filenames"""
+    return "".join(c for c in text if c.isalnum() or c in (' ', '-', '_', '.')).strip()
+
+
+def format_expression(value, isText):
+    """Build a parameter expression from a variation value"""
+    if isText:
+        return "'{}'".format(value.replace("'", "\\'"))
+    return str(value)
+
+
+# Length units relative to millimeters and angle units relative to degrees
+UNIT_FACTORS = {
+    'um': ('length', 0.001),
+    'mm': ('length', 1.0),
+    'cm': ('length', 10.0),
+    'm': ('length', 1000.0),
+    'in': ('length', 25.4),
+    'ft': ('length', 304.8),
+    'deg': ('angle', 1.0),
+    'rad': ('angle', 180.0 / math.pi)
+}
+
+QUANTITY_PATTERN = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-zA-Z]*)\s*$')
+LINSPACE_PATTERN = re.compile(r'^linspace\s+(.+?)\.\.(.+?)\s+n\s*=\s*(\d+)\s*$', re.IGNORECASE)
+
+
+def parse_quantity(text):
+    """Split '10 mm' into (10.0, 'mm'); the unit may be empty"""
+    match = QUANTITY_PATTERN.match(text)
+    if not match:
+        raise ValueError(f'Not a number: {text.strip()}')
+    unit = match.group(2)
+    if unit and unit not in UNIT_FACTORS:
+        raise ValueError(f'Unknown unit "{unit}" in: {text.strip()}')
+    return float(match.group(1)), unit
+
+
+def convert_quantity(value, fromUnit, toUnit):
+    """Convert between units of the same kind; a missing unit means 'same as the other'"""
+    if not fromUnit or not toUnit or fromUnit == toUnit:
+        return value
+    fromKind, fromFactor = UNIT_FACTORS[fromUnit]
+    toKind, toFactor = UNIT_FACTORS[toUnit]
+    if fromKind != toKind:
+        raise ValueError(f'Cannot mix {fromUnit} and {toUnit}')
+    return value * fromFactor / toFactor
+
+
+class NumericRange:
+    """Evenly spaced numeric values, generated on demand like range()"""
+    def __init__(self, start, step, count, unit=''):
+        self.start = start
+        self.step = step
+        self.count = count
+        self.unit = unit
+        
+    def __len__(self):
+        return self.count
+    
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        value = self.start + index * self.step
+        return f'{value:.10g} {self.unit}'.strip()
+    
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+
+def parse_range(text):
+    """Parse 'start:stop[:step]' (stop inclusive, units allowed) into a NumericRange"""
+    parts = text.split(':')
+    if len(parts) not in (2, 3):
+        raise ValueError(f'Expected start:stop:step but got: {text.strip()}')
+    start, unit = parse_quantity(parts[0])
+    stop, stopUnit = parse_quantity(parts[1])
+    stop = convert_quantity(stop, stopUnit, unit)
+    unit = unit or stopUnit
+    if len(parts) == 3:
+        step, stepUnit = parse_quantity(parts[2])
+        step = convert_quantity(step, stepUnit, unit)
+        unit = unit or stepUnit
+    else:
+        step = 1.0 if stop >= start else -1.0
+    
+    if step == 0 or (stop - start) * step < 0:
+        raise ValueError(f'Step {step:g} never reaches {stop:g} in: {text.strip()}')
+    # Small tolerance so 0:1:0.1 includes 1 despite float rounding
+    count = int(math.floor((stop - start) / step + 1e-9)) + 1
+    return NumericRange(start, step, count, unit)
+
+
+def parse_linspace(match):
+    """Build a NumericRange from a 'linspace start..stop n=count' match"""
+    start, unit = parse_quantity(match.group(1))
+    stop, stopUnit = parse_quantity(match.group(2))
+    stop = convert_quantity(stop, stopUnit, unit)
+    unit = unit or stopUnit
+    count = int(match.group(3))
+    if count < 1:
+        raise ValueError('linspace needs n >= 1')
+    step = (stop - start) / (count - 1) if count > 1 else 0.0
+    return NumericRange(start, step, count, unit)
+
+
+class FileValues:
+    """Values listed in a CSV/text file, one or more per line, streamed from disk.
+    
+    The file is counted once up front; iterating streams it again.
+    Random access (needed when combining several parameters) loads the
+    values on first use.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.loaded = None
+        self.count = sum(1 for value in self)
+        
+    def __len__(self):
+        return self.count
+    
+    def __iter__(self):
+        if self.loaded is not None:
+            yield from self.loaded
+            return
+        with open(self.path, 'r', newline='', encoding='utf-8-sig') as f:
+            for row in csv.reader(f):
+                for cell in row:
+                    if cell.strip():
+                        yield cell.strip()
+                        
+    def __getitem__(self, index):
+        if self.loaded is None:
+            self.loaded = list(self)
+        return self.loaded[index]
+
+
+class VariationList:
+    """Concatenation of literal values, ranges and value files with lazy access"""
+    def __init__(self, parts):
+        self.parts = [part for part in parts if len(part)]
+        self.offsets = []
+        total = 0
+        for part in self.parts:
+            self.offsets.append(total)
+            total += len(part)
+        self.count = total
+        
+    def __len__(self):
+        return self.count
+    
+    def __iter__(self):
+        for part in self.parts:
+            yield from part
+            
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        partIdx = bisect.bisect_right(self.offsets, index) - 1
+        return self.parts[partIdx][index - self.offsets[partIdx]]
+
+
+def parse_variations(text, isText=True, baseFolder=None):
+    """Parse the variations text box into a lazily expanded VariationList.
+    
+    Values are separated by commas. '@file.csv' reads values from a file
+    (relative paths are resolved against baseFolder); '@@' starts a literal
+    value with '@', as in '@@home' for the text '@home'. For numeric
+    parameters 'start:stop:step' and 'linspace start..stop n=count' expand
+    to evenly spaced values; each part may carry a unit, as in
+    '10 mm:2 in:1 mm'.
+    """
+    parts = []
+    literals = []
+    for token in text.split(','):
+        token = token.strip()
+        if not token:
+            continue
+        
+        part = None
+        if token.startswith('@@'):
+            token = token[1:]
+        elif token.startswith('@'):
+            path = os.path.expanduser(token[1:].strip())
+            if baseFolder and not os.path.isabs(path):
+                path = os.path.join(baseFolder, path)
+            if not os.path.isfile(path):
+                raise ValueError(f'Values file not found: {path}\nWrite @@ for a value that starts with @, e.g. @@{token[1:]}')
+            part = FileValues(path)
+        elif not isText and LINSPACE_PATTERN.match(token):
+            part = parse_linspace(LINSPACE_PATTERN.match(token))
+        elif not isText and ':' in token:
+            part = parse_range(token)
+            
+        if part is None:
+            literals.append(token)
+            continue
+        if literals:
+            parts.append(literals)
+            literals = []
+        parts.append(part)
+        
+    if literals:
+        parts.append(literals)
+    return VariationList(parts)
+
+
+class TableRow(tuple):
+    """Parameter values of one variation table row, with the row's filename and objects (None when not given)"""
+    filename = None
+    objects = None
+
+
+class VariationTable:
+    """Variations read row by row from a CSV file with a header row, or a JSONL file of objects.
+    
+    Every column names a user parameter, except _filename (the output
+    filename of the row) and _objects (the objects the row exports,
+    separated by semicolons, or a JSON list). The file is scanned once for
+    its columns and row count; iterating streams it again, so memory does
+    not grow with the number of rows.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.isJson = os.path.splitext(path)[1].lower() in TABLE_JSON_EXTENSIONS
+        self.columns = None
+        self.count = 0
+        self.hasFilenames = False
+        self.hasObjects = False
+        # The first row sets the columns
+        for row in self._rows():
+            self.count += 1
+            self.hasFilenames = self.hasFilenames or row.filename is not None
+            self.hasObjects = self.hasObjects or row.objects is not None
+        if not self.count:
+            raise ValueError(f'The variation table has no rows: {path}')
+    
+    def __len__(self):
+        return self.count
+    
+    def __iter__(self):
+        return self._rows()
+    
+    def _records(self):
+        """(line number, {column: value}) per non-empty line"""
+        name = os.path.basename(self.path)
+        with open(self.path, 'r', newline='', encoding='utf-8-sig') as f:
+            if self.isJson:
+                for lineNumber, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError as e:
+                        raise ValueError(f'{name}, line {lineNumber}: not valid JSON ({e})')
+                    if not isinstance(record, dict):
+                        raise ValueError(f'{name}, line {lineNumber}: expected an object like {{"width": "10 mm"}}')
+                    yield lineNumber, record
+                return
+            
+            reader = csv.DictReader(f)
+            for record in reader:
+                if None in record:
+                    raise ValueError(f'{name}, line {reader.line_num}: more cells than columns (quote values that contain commas)')
+                if any(value and value.strip() for value in record.values()):
+                    yield reader.line_num, record
+    
+    def _rows(self):
+        """TableRow per record; the columns are those of the header or the first JSON object"""
+        name = os.path.basename(self.path)
+        columns = self.columns
+        for lineNumber, record in self._records():
+            record = {str(key).strip(): value for key, value in record.items()}
+            if columns is None:
+                unknown = [key for key in record if key.startswith('_') and key not in (TABLE_FILENAME_COLUMN, TABLE_OBJECTS_COLUMN)]
+                if unknown:
+                    raise ValueError(f'{name}: unknown column {unknown[0]}; only {TABLE_FILENAME_COLUMN} and {TABLE_OBJECTS_COLUMN} may start with _')
+                columns = self.columns = [key for key in record if key and not key.startswith('_')]
+                if not columns:
+                    raise ValueError(f'{name}: no parameter columns')
+            elif self.isJson:
+                extra = [key for key in record if key not in columns and key not in (TABLE_FILENAME_COLUMN, TABLE_OBJECTS_COLUMN)]
+                if extra:
+                    raise ValueError(f'{name}, line {lineNumber}: {extra[0]} is not a column of the first row')
+            
+            values = []
+            for column in columns:
+                value = record.get(column)
+                value = '' if value is None else str(value).strip()
+                if not value:
+                    raise ValueError(f'{name}, line {lineNumber}: no value for {column}')
+                values.append(value)
+            row = TableRow(values)
+            
+            filename = record.get(TABLE_FILENAME_COLUMN)
+            if filename is not None and str(filename).strip():
+                row.filename = str(filename).strip()
+            objects = record.get(TABLE_OBJECTS_COLUMN)
+            if isinstance(objects, str):
+                objects = objects.split(';')
+            objects = [str(objName).strip() for objName in objects or () if str(objName).strip()]
+            if objects:
+                row.objects = objects
+            yield row
+
+
+class TableColumn:
+    """Values of one variation table column, streamed from the file"""
+    def __init__(self, table, columnIdx):
+        self.table = table
+        self.columnIdx = columnIdx
+    
+    def __len__(self):
+        return len(self.table)
+    
+    def __iter__(self):
+        for row in self.table:
+            yield row[self.columnIdx]
+    
+    def __getitem__(self, index):
+        # Streams up to the row; meant for the first values, not random access
+        if index < 0:
+            index += len(self)
+        for rowIdx, value in enumerate(self):
+            if rowIdx == index:
+                return value
+        raise IndexError(index)
+
+
+def open_variation_table(text, baseFolder=None):
+    """VariationTable for a path typed in the dialog, relative paths resolved against baseFolder"""
+    path = os.path.expanduser(text.strip().lstrip('@').strip())
+    if baseFolder and not os.path.isabs(path):
+        path = os.path.join(baseFolder, path)
+    if not os.path.isfile(path):
+        raise ValueError(f'Variation table not found: {path}')
+    return VariationTable(path)
+
+
+def variant_units(units, combination):
+    """Units a variation exports: all of them, or those a variation table row lists in _objects"""
+    objects = getattr(combination, 'objects', None)
+    if not objects:
+        return units
+    wanted = {objName.lower() for objName in objects}
+    subset = [unit for unit in units if unit.name.lower() in wanted]
+    if len(subset) < len(wanted):
+        missing = sorted(wanted - {unit.name.lower() for unit in subset})
+        raise ValueError(f'The variation table lists objects that are not selected: {", ".join(missing)}\n'
+                         'Select them, using the names shown in the dialog.')
+    return subset
+
+
+def parse_extra_params(text):
+    """Parse 'name = values' lines into a list of (name, valuesText).
+    
+    The values text is parsed with parse_variations once the parameter
+    type is known.
+    """
+    extraParams = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if '=' not in line:
+            raise ValueError(f'Expected "name = values" but got: {line.strip()}')
+        name, values = line.split('=', 1)
+        extraParams.append((name.strip(), values))
+    return extraParams
+
+
+def count_combinations(axisValues, zipMode):
+    """Number of combinations a sweep yields, computed without generating them"""
+    if not axisValues:
+        return 0
+    if zipMode:
+        return min(len(values) for values in axisValues)
+    total = 1
+    for values in axisValues:
+        total *= len(values)
+    return total
+
+
+def iter_sweep_combinations(axisValues, zipMode):
+    """Lazily yield one tuple of values per combination of the swept parameters.
+    
+    Zip mode pairs values by position. Otherwise every combination is yielded
+    in reflected (boustrophedon) order, so each combination differs from the
+    previous one in exactly one parameter and only that one needs recomputing.
+    """
+    if zipMode or len(axisValues) == 1:
+        # Plain iteration keeps file-backed values streaming
+        yield from zip(*axisValues)
+        return
+    
+    counts = [len(values) for values in axisValues]
+    if not counts or 0 in counts:
+        return
+    
+    indices = [0] * len(counts)
+    directions = [1] * len(counts)
+    yield tuple(values[0] for values in axisValues)
+    
+    while True:
+        for axis in reversed(range(len(counts))):
+            nextIndex = indices[axis] + directions[axis]
+            if 0 <= nextIndex < counts[axis]:
+                indices[axis] = nextIndex
+                break
+            directions[axis] = -directions[axis]
+        else:
+            return
+        yield tuple(values[i] for values, i in zip(axisValues, indices))
+
+
+def fingerprint_bodies(exportKey, bodyRecords):
+    """Hash body measurements together with the export options.
+    
+    Each record is (measurements, faceCount, edgeCount) where measurements
+    is a sequence of floats such as volume, area, centre of mass and
+    bounding box.
+    """
+    parts = [exportKey]
+    for measurements, faceCount, edgeCount in bodyRecords:
+        parts.append(' '.join(f'{v:.9g}' for v in measurements))
+        parts.append(f'{faceCount} {edgeCount}')
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def load_geometry_cache(outputFolder, filename=GEOMETRY_CACHE_FILE):
+    """Load a fingerprint-keyed cache stored in the output folder.
+    
+    The geometry cache maps fingerprints to {'file', 'size', 'sha256'} of
+    the file exported for them.
+    """
+    cachePath = os.path.join(outputFolder, filename)
+    try:
+        with open(cachePath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_geometry_cache(outputFolder, cache, filename=GEOMETRY_CACHE_FILE):
+    """Write a fingerprint-keyed cache to the output folder"""
+    cachePath = os.path.join(outputFolder, filename)
+    # Replace atomically, other farm workers may be reading the cache
+    tempPath = f'{cachePath}.{os.getpid()}.tmp'
+    with open(tempPath, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=1)
+    os.replace(tempPath, cachePath)
+
+
+def is_cache_entry_valid(folder, entry):
+    """Check that a geometry cache entry's file still holds what was exported for its fingerprint.
+    
+    Entries added in the current run are trusted until their checksum is known.
+    The executor calls this at most once per entry and run; after that the
+    entry is trusted until its file is replaced.
+    """
+    fullPath = os.path.join(folder, entry['file'])
+    try:
+        if 'sha256' not in entry:
+            return os.path.isfile(fullPath)
+        if os.path.getsize(fullPath) != entry['size']:
+            return False
+        return file_sha256(fullPath) == entry['sha256']
+    except OSError:
+        return False
+
+
+def remove_export(path):
+    """Delete an earlier file before exporting to its path.
+    
+    Exporting over it in place would also change every name hardlinked to it.
+    """
+    if os.path.lexists(path):
+        os.remove(path)
+
+
+def reuse_export(sourcePath, targetPath):
+    """Hardlink an existing export to a new name, copying when links are not supported"""
+    if os.path.exists(targetPath):
+        if os.path.samefile(sourcePath, targetPath):
+            return
+        os.remove(targetPath)
+    try:
+        os.link(sourcePath, targetPath)
+    except OSError:
+        shutil.copyfile(sourcePath, targetPath)
+
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(outputFolder):
+    """Read the manifest and any per-worker shards in the output folder; the latest entry per file wins"""
+    entries = {}
+    for name in [MANIFEST_FILE] + worker_files(outputFolder, MANIFEST_FILE):
+        manifestPath = os.path.join(outputFolder, name)
+        if not os.path.exists(manifestPath):
+            continue
+        with open(manifestPath, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash can leave a partial last line
+                    continue
+                entries[entry['path']] = entry
+    return entries
+
+
+def is_manifest_entry_valid(outputFolder, entry):
+    """Check that the file recorded by a manifest entry still exists unchanged"""
+    fullPath = os.path.join(outputFolder, entry.get('stored', entry['path']))
+    try:
+        if os.path.getsize(fullPath) != entry['size']:
+            return False
+        return file_sha256(fullPath) == entry['sha256']
+    except OSError:
+        return False
+
+
+def make_manifest_entry(filename, variant, expressions, objName, exportKey, size, sha256, stored=None, mesh=None,
+                        computePath=None):
+    """Describe a finished export for the manifest.
+    
+    stored is the file actually on disk when post-processing renamed it
+    (for example after compressing to .gz); mesh holds the validation
+    statistics of STL files; computePath records how selective compute
+    recomputed the variation.
+    """
+    entry = {
+        'variant': variant,
+        'expressions': expressions,
+        'object': objName,
+        'options': exportKey,
+        'path': filename,
+        'size': size,
+        'sha256': sha256,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    if stored and stored != filename:
+        entry['stored'] = stored
+    if mesh:
+        entry['mesh'] = mesh
+    if computePath:
+        entry['compute'] = computePath
+    return entry
+
+
+def make_failure_record(variantIdx, variant, expressions, objName, filename, selectedFormat, stage, error, tracebackText,
+                        seconds, variantSeconds, attempt):
+    """Describe a failed variation (objName and filename None) or file for batch_failures.jsonl"""
+    return {
+        'variantIndex': variantIdx,
+        'variant': variant,
+        'expressions': expressions,
+        'object': objName,
+        'path': filename,
+        'format': selectedFormat,
+        'stage': stage,
+        'error': error,
+        'traceback': tracebackText,
+        'seconds': round(seconds, 4),
+        'variantSeconds': round(variantSeconds, 4),
+        'attempt': attempt,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def write_failed_job(outputFolder, failedJobs, workerId='', keptEntries=()):
+    """Write the files that still fail as a job the 'Retry failed files only' mode re-runs.
+    
+    One line per variation with its index, values and filenames. keptEntries
+    are lines of the previous job to keep as they are, such as those a
+    cancelled retry run did not reach. Without failures an earlier job
+    file is removed.
+    """
+    jobPath = os.path.join(outputFolder, worker_file(FAILED_JOB_FILE, workerId))
+    failedJobs = sorted((job for job in failedJobs if job.exports), key=lambda job: job.index)
+    keptEntries = [entry for entry in keptEntries if entry['files']]
+    if not failedJobs and not keptEntries:
+        if os.path.exists(jobPath):
+            os.remove(jobPath)
+        return
+    with open(jobPath, 'w', encoding='utf-8') as f:
+        for job in failedJobs:
+            f.write(json.dumps({
+                'variantIndex': job.index,
+                'variant': job.values,
+                'expressions': job.expressions,
+                'files': [{'object': unit.name, 'path': filename, 'format': selectedFormat}
+                          for unit, filename, selectedFormat in job.exports]
+            }) + '\n')
+        for entry in keptEntries:
+            f.write(json.dumps(entry) + '\n')
+
+
+def load_failed_entries(outputFolder):
+    """Lines of the failed-files job in the output folder"""
+    entries = []
+    jobPath = os.path.join(outputFolder, FAILED_JOB_FILE)
+    if os.path.exists(jobPath):
+        with open(jobPath, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    return entries
+
+
+def load_failed_job(outputFolder, entries=None):
+    """(variantRanges, filenames) of the failed-files job in the output folder, or of its already loaded entries"""
+    entries = load_failed_entries(outputFolder) if entries is None else entries
+    variantIndices = {entry['variantIndex'] for entry in entries}
+    filenames = {file['path'] for entry in entries for file in entry['files']}
+    return [(idx, idx + 1) for idx in sorted(variantIndices)], filenames
+
+
+def make_postprocess_task(config, filename):
+    """Picklable description of the post-processing for one exported file"""
+    return {
+        'outputFolder': config.exportFolder,
+        'filename': filename,
+        'binaryStl': config.binaryStl,
+        'gzip': config.gzipOutput,
+        'copyTo': config.copyToFolder,
+        'validateMesh': config.validateMeshes,
+        'maxOpenEdges': config.maxOpenEdges
+    }
+
+
+def postprocess_file(task):
+    """Post-process one exported file and checksum the result.
+    
+    Runs in a worker process (or thread), so it only takes and returns
+    plain data. Errors are returned rather than raised.
+    """
+    outcome = {'filename': task['filename'], 'stored': task['filename'], 'error': None}
+    try:
+        path = os.path.join(task['outputFolder'], task['filename'])
+        
+        if task['binaryStl'] and path.lower().endswith('.stl'):
+            mesh_io.ascii_stl_to_binary(path)
+        
+        # Validate before compressing, while the STL can still be memory-mapped
+        if task['validateMesh'] and path.lower().endswith('.stl'):
+            outcome['mesh'], outcome['meshProblems'] = mesh_io.validate_stl(path, maxOpenEdges=task['maxOpenEdges'])
+        
+        if task['gzip']:
+            gzPath = path + '.gz'
+            with open(path, 'rb') as src, gzip.open(gzPath + '.tmp', 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(gzPath + '.tmp', gzPath)
+            os.remove(path)
+            path = gzPath
+            outcome['stored'] = task['filename'] + '.gz'
+        
+        outcome['size'] = os.path.getsize(path)
+        outcome['sha256'] = file_sha256(path)
+        
+        if task['copyTo']:
+            shutil.copyfile(path, os.path.join(task['copyTo'], outcome['stored']))
+    except Exception as e:
+        outcome['error'] = f'{type(e).__name__}: {e}'
+        outcome['traceback'] = traceback.format_exc()
+    return outcome
+
+
+def pool_ping():
+    """Trivial task used to check that worker processes can import this module"""
+    return os.getpid()
+
+
+def create_postprocess_pool(workers):
+    """Start a process pool for post-processing, falling back to threads.
+    
+    Worker processes need a real Python interpreter that can import this
+    module; inside some hosts (Fusion among them) that is not guaranteed,
+    so the pool is tested once and replaced by a thread pool if it fails.
+    Returns (pool, kind).
+    """
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        pool = None
+        try:
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            pool.submit(pool_ping).result(timeout=60)
+            return pool, 'processes'
+        except Exception:
+            if pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+    return concurrent.futures.ThreadPoolExecutor(max_workers=workers), 'threads'
+
+
+class RetryPolicy:
+    """How often failed files are retried at the end of a run, and how each attempt relaxes the settings"""
+    def __init__(self, attempts=0, timeoutFactor=2.0, lowerRefinement=False):
+        self.attempts = attempts
+        # Each attempt waits timeoutFactor times longer for compute to settle
+        self.timeoutFactor = timeoutFactor
+        # Each attempt tessellates one refinement step coarser (High -> Medium -> Low)
+        self.lowerRefinement = lowerRefinement
+    
+    def config_for(self, config, attempt):
+        """Copy of config with the settings of a retry attempt"""
+        if attempt == 0:
+            return config
+        retryConfig = copy.copy(config)
+        retryConfig.computeTimeout = config.computeTimeout * self.timeoutFactor ** attempt
+        if self.lowerRefinement and config.meshRefinement in REFINEMENTS:
+            retryConfig.meshRefinement = REFINEMENTS[max(0, REFINEMENTS.index(config.meshRefinement) - attempt)]
+        return retryConfig
+
+
+class MeshSettings:
+    """Custom tessellation tolerances; lengths in centimeters, angles in radians"""
+    def __init__(self, surfaceDeviation, normalDeviation, maxEdgeLength):
+        self.surfaceDeviation = surfaceDeviation
+        self.normalDeviation = normalDeviation
+        self.maxEdgeLength = maxEdgeLength
+    
+    @classmethod
+    def from_bounds(cls, diagonal, meshRefinement='Medium'):
+        """Settings proportional to an object's bounding box diagonal"""
+        fraction, degrees = ADAPTIVE_REFINEMENT.get(meshRefinement, ADAPTIVE_REFINEMENT['Medium'])
+        diagonal = max(diagonal, 1e-4)
+        return cls(diagonal * fraction, math.radians(degrees), diagonal / 10.0)
+    
+    def scaled(self, factor):
+        """Coarser (factor > 1) or finer (factor < 1) settings"""
+        normalDeviation = min(max(self.normalDeviation * factor, math.radians(0.5)), math.radians(45.0))
+        return MeshSettings(self.surfaceDeviation * factor, normalDeviation, self.maxEdgeLength * factor)
+    
+    def to_dict(self):
+        return {'surfaceDeviation': self.surfaceDeviation, 'normalDeviation': self.normalDeviation,
+                'maxEdgeLength': self.maxEdgeLength}
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['surfaceDeviation'], data['normalDeviation'], data['maxEdgeLength'])
+
+
+def search_mesh_settings(triangleCount, target, start, tolerance=0.1, maxSteps=6):
+    """Scale start until triangleCount(settings) is within tolerance of target.
+    
+    The triangle count is modelled as a power of the scale factor, with
+    the exponent re-estimated from the last two tries (a secant step in
+    log space). Returns (settings, triangles) of the closest try.
+    """
+    logFactor = 0.0
+    exponent = 1.0
+    previous = None
+    best = None
+    for step in range(maxSteps):
+        count = max(1, triangleCount(start.scaled(math.exp(logFactor))))
+        error = math.log(count / target)
+        if best is None or abs(error) < abs(best[0]):
+            best = (error, logFactor, count)
+        if abs(count - target) <= tolerance * target:
+            break
+        if previous and previous[1] != error:
+            exponent = min(max((previous[1] - error) / (logFactor - previous[0]), 0.25), 4.0)
+        previous = (logFactor, error)
+        # Too many triangles -> coarser settings; at most 16x per step
+        logFactor += min(max(error / exponent, -math.log(16)), math.log(16))
+    error, logFactor, count = best
+    return start.scaled(math.exp(logFactor)), count
+
+
+def choose_mesh_settings(config, backend, unit):
+    """Custom tessellation settings for a unit, scaled to its size or searched for the target"""
+    start = MeshSettings.from_bounds(backend.bounding_diagonal(unit), config.meshRefinement)
+    if config.adaptiveMesh == ADAPTIVE_BOUNDS:
+        return start
+    target = config.meshTarget
+    if config.adaptiveMesh == ADAPTIVE_FILE_SIZE:
+        meshFormat = next(f for f in config.formats if is_mesh_format(f))
+        target = mesh_io.triangles_for_file_size(config.meshTarget * 1024, meshFormat)
+    settings, _ = search_mesh_settings(lambda candidate: backend.triangle_count(unit, candidate), target, start)
+    return settings
+
+
+class SweepAxis:
+    """One swept parameter and its values.
+    
+    param is whatever handle the backend needs to change the parameter
+    (a Fusion UserParameter for the Fusion backend).
+    """
+    def __init__(self, name, values, isText, originalExpression=None, param=None):
+        self.name = name
+        self.values = values
+        self.isText = isText
+        self.originalExpression = originalExpression
+        self.param = param
+
+
+class ExportUnit:
+    """One file per variation: a name, the entity to export and the entities it contains"""
+    def __init__(self, name, entity=None, contents=None):
+        self.name = name
+        self.entity = entity
+        self.contents = contents if contents is not None else [entity]
+
+
+class IndexedObject:
+    """One exportable object in an ObjectIndex"""
+    def __init__(self, kind, name, path, entity):
+        self.kind = kind
+        self.name = name
+        self.path = path
+        self.entity = entity
+        self.inputId = None
+        self.displayName = name
+        self.searchText = path.lower()
+        self.selected = False
+        # True once the dialog has a checkbox for this object
+        self.listed = False
+
+
+class ObjectIndex:
+    """Snapshot of the exportable objects of a design.
+    
+    Objects get dialog input IDs and display names that are unique even
+    when several objects share a name, so the design is scanned once per
+    dialog instead of on every lookup.
+    """
+    def __init__(self):
+        self.entries = []
+        self.byId = {}
+        
+    def add(self, kind, name, path, entity=None):
+        entry = IndexedObject(kind, name, path, entity)
+        baseId = f'{kind}_{sanitize_id(name)}'
+        inputId = baseId
+        suffix = 2
+        while inputId in self.byId:
+            inputId = f'{baseId}_{suffix}'
+            suffix += 1
+        entry.inputId = inputId
+        self.entries.append(entry)
+        self.byId[inputId] = entry
+        return entry
+    
+    def finish(self):
+        """Give objects whose name is not unique their full path as display name"""
+        nameCounts = {}
+        for entry in self.entries:
+            nameCounts[entry.name] = nameCounts.get(entry.name, 0) + 1
+        for entry in self.entries:
+            entry.displayName = entry.name if nameCounts[entry.name] == 1 else entry.path
+        return self
+    
+    def of_kind(self, kind):
+        return [entry for entry in self.entries if entry.kind == kind]
+    
+    def matching(self, kind, text):
+        """Objects of a kind whose path contains every word of text (case-insensitive)"""
+        words = text.lower().split()
+        return [entry for entry in self.entries
+                if entry.kind == kind and all(word in entry.searchText for word in words)]
+    
+    def selected_entries(self):
+        return [entry for entry in self.entries if entry.selected]
+
+
+class BatchConfig:
+    """Everything the batch loop needs to know about a run"""
+    def __init__(self, axes, outputFolder, selectedFormat='STL (Binary)', selectedUnit='Millimeters',
+                 meshRefinement='Medium', zipMode=False, prefix='', suffix='', addNumbering=False,
+                 includeParamName=False, computeTimeout=30.0, reuseDuplicates=False,
+                 runMode=RUN_EXPORT_ALL, combineObjects=False, fastMode=False, progressInterval=0.5,
+                 postprocessWorkers=0, binaryStl=False, gzipOutput=False, copyToFolder='', extraFormats=(),
+                 tessellateOnce=False, validateMeshes=False, maxOpenEdges=0, workerId='', filenameTemplate='',
+                 archiveFormat='', selectiveCompute=False, adaptiveMesh='', meshTarget=0, retryPolicy=None,
+                 variationTable=None):
+        self.axes = axes
+        # Rows of a VariationTable replace the combinations of the axes, which are its columns
+        self.variationTable = variationTable
+        if variationTable is not None:
+            if [axis.name for axis in axes] != variationTable.columns:
+                raise ValueError('The sweep parameters do not match the variation table columns')
+            if combineObjects and variationTable.hasObjects:
+                raise ValueError(f'The {TABLE_OBJECTS_COLUMN} column needs one file per object; '
+                                 'untick "One file per variation (all objects)"')
+        self.outputFolder = outputFolder
+        # Files are streamed into one archive ('zip' or 'tar.zst') instead of left loose;
+        # they are exported to a staging folder and removed once archived
+        self.archiveFormat = archiveFormat
+        if archiveFormat and archiveFormat not in archive_io.archive_kinds():
+            raise ValueError(f'{archiveFormat} archives are not available (is zstandard installed?)')
+        self.exportFolder = os.path.join(outputFolder, worker_file(ARCHIVE_STAGING_FOLDER, workerId)) if archiveFormat else outputFolder
+        self.selectedFormat = selectedFormat
+        # Every format written per variation, the main format first
+        self.formats = [selectedFormat] + [f for f in extraFormats if f != selectedFormat]
+        if len({file_extension(f) for f in self.formats}) < len(self.formats):
+            raise ValueError('Two of the selected formats write the same file extension')
+        # Tessellate each unit once per variation and write the mesh formats in-process
+        self.tessellateOnce = tessellateOnce
+        self.selectedUnit = selectedUnit
+        self.meshRefinement = meshRefinement
+        # Per-object custom tessellation (ADAPTIVE_*) instead of one refinement for the whole batch;
+        # meshTarget is the triangle count or file size in KB the search aims for
+        self.adaptiveMesh = adaptiveMesh
+        self.meshTarget = meshTarget
+        if adaptiveMesh and not any(is_mesh_format(f) for f in self.formats):
+            raise ValueError('Adaptive mesh refinement needs an STL, OBJ or 3MF format')
+        if adaptiveMesh in (ADAPTIVE_TRIANGLES, ADAPTIVE_FILE_SIZE) and meshTarget <= 0:
+            raise ValueError('Set a target triangle count or file size for adaptive mesh refinement')
+        self.zipMode = zipMode
+        self.prefix = prefix
+        self.suffix = suffix
+        self.addNumbering = addNumbering
+        self.includeParamName = includeParamName
+        # Optional template such as '{prefix}_{n:03}_{param}={value}_{object}{ext}'
+        self.filenameTemplate = filenameTemplate
+        self.computeTimeout = computeTimeout
+        # Let the backend skip the full recompute when only late features depend on the changed parameters
+        self.selectiveCompute = selectiveCompute
+        # F3D archives the whole design, so it is never deduplicated
+        self.reuseDuplicates = reuseDuplicates and 'F3D' not in selectedFormat
+        # An archive is written from scratch, so there is nothing on disk to resume from
+        self.runMode = RUN_EXPORT_ALL if archiveFormat and runMode != RUN_RETRY_FAILED else runMode
+        self.retryPolicy = retryPolicy or RetryPolicy()
+        self.combineObjects = combineObjects
+        # Fast mode skips the per-variation viewport refresh and throttles progress updates
+        self.fastMode = fastMode
+        self.progressInterval = progressInterval
+        # Post-processing runs in a pool of this many workers (0 = inline)
+        self.postprocessWorkers = postprocessWorkers
+        self.binaryStl = binaryStl
+        self.gzipOutput = gzipOutput and not archiveFormat
+        self.copyToFolder = copyToFolder
+        # STL files are checked for empty, open or inside-out meshes after export
+        self.validateMeshes = validateMeshes
+        self.maxOpenEdges = maxOpenEdges
+        # Farm workers write their own manifest and timing files, merged at the end
+        self.workerId = workerId
+    
+    @property
+    def fileExt(self):
+        return file_extension(self.selectedFormat)
+    
+    @property
+    def exportKey(self):
+        """Export options that change the written file"""
+        return self.export_key(self.selectedFormat)
+    
+    def export_key(self, selectedFormat):
+        """Export options that change a file written in selectedFormat"""
+        writer = '|mesh_io' if self.tessellateOnce and is_mesh_format(selectedFormat) else ''
+        adaptive = f'|adaptive={self.adaptiveMesh}:{self.meshTarget}' if self.adaptiveMesh and is_mesh_format(selectedFormat) else ''
+        return f'{selectedFormat}|{self.selectedUnit}|{self.meshRefinement}{adaptive}{writer}'
+    
+    @property
+    def meshSettingsKey(self):
+        """Options that decide the adaptive mesh settings of an object"""
+        meshFormat = next((f for f in self.formats if is_mesh_format(f)), '')
+        return f'mesh-settings|{self.meshRefinement}|{self.adaptiveMesh}:{self.meshTarget}|{meshFormat}'
+    
+    def combination_count(self):
+        if self.variationTable is not None:
+            return len(self.variationTable)
+        return count_combinations([axis.values for axis in self.axes], self.zipMode)
+    
+    def iter_combinations(self):
+        if self.variationTable is not None:
+            return iter(self.variationTable)
+        return iter_sweep_combinations([axis.values for axis in self.axes], self.zipMode)
+
+
+class FilenameBuilder:
+    """Builds the output filenames of a run.
+    
+    A filename template such as '{prefix}_{n:03}_{param}={value}_{object}{ext}'
+    is compiled once; without one the prefix / numbering / values / object /
+    suffix options are used. Object names are sanitized once, and parameter
+    values once per distinct value for the first SAFE_VALUE_CACHE_SIZE values
+    of each axis.
+    """
+    def __init__(self, config, units):
+        self.config = config
+        self.unitCount = len(units)
+        self.safeUnits = {unit.name: sanitize_filename(unit.name) for unit in units}
+        self.safeValues = [{} for _ in config.axes]
+        self.extensions = {file_extension(f).lower() for f in config.formats}
+        self.segments = self._compile(config.filenameTemplate) if config.filenameTemplate else None
+        
+    def _compile(self, template):
+        """Split the template into (literal, field, formatSpec) segments; raises ValueError for bad templates"""
+        axisIndex = {axis.name: axisIdx for axisIdx, axis in enumerate(self.config.axes)}
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise ValueError(f'Invalid filename template: {e}')
+        
+        segments = []
+        for position, (literal, field, spec, conversion) in enumerate(parsed):
+            literal = INVALID_FILENAME_CHARS.sub('', literal)
+            if field is None:
+                segments.append((literal, None, ''))
+                continue
+            if field not in TEMPLATE_FIELDS and field not in axisIndex:
+                known = ', '.join('{' + name + '}' for name in TEMPLATE_FIELDS)
+                raise ValueError(f'Unknown field {{{field}}} in filename template.\nUse {known} or a parameter name.')
+            if field == 'ext':
+                if position != len(parsed) - 1:
+                    raise ValueError('{ext} must come last in the filename template')
+                segments.append((literal, None, ''))
+                continue
+            try:
+                format(1 if field == 'n' else '', spec or '')
+            except ValueError as e:
+                raise ValueError(f'Invalid format for {{{field}}} in filename template: {e}')
+            # Built-in fields win over parameters of the same name
+            segments.append((literal, field if field in TEMPLATE_FIELDS else axisIndex[field], spec or ''))
+        return segments
+    
+    def _safe_value(self, axisIdx, value, variantIdx):
+        cache = self.safeValues[axisIdx]
+        safe = cache.get(value)
+        if safe is None:
+            safe = sanitize_filename(value)
+            if len(cache) < SAFE_VALUE_CACHE_SIZE:
+                cache[value] = safe
+        return safe or f'variant_{variantIdx+1}'
+    
+    def build(self, variantIdx, combination, unitName, fileExt=None):
+        """Filename for one export unit of one variation"""
+        config = self.config
+        fileExt = fileExt or config.fileExt
+        rowFilename = getattr(combination, 'filename', None)
+        if rowFilename:
+            return self._row_filename(rowFilename, variantIdx, unitName, fileExt)
+        values = [self._safe_value(axisIdx, value, variantIdx) for axisIdx, value in enumerate(combination)]
+        
+        if self.segments is None:
+            filenameParts = []
+            if config.prefix:
+                filenameParts.append(config.prefix)
+            if config.addNumbering:
+                filenameParts.append(f'{variantIdx+1:03d}')
+            for axis, value in zip(config.axes, values):
+                if config.includeParamName:
+                    filenameParts.append(axis.name)
+                filenameParts.append(value)
+            if self.unitCount > 1:
+                filenameParts.append(self.safeUnits[unitName])
+            if config.suffix:
+                filenameParts.append(config.suffix)
+            return '_'.join(filenameParts) + fileExt
+        
+        stem = []
+        for literal, field, spec in self.segments:
+            stem.append(literal)
+            if field is None:
+                continue
+            if isinstance(field, int):
+                text = values[field]
+            elif field == 'n':
+                text = variantIdx + 1
+            elif field == 'param':
+                text = config.axes[0].name if config.axes else ''
+            elif field == 'value':
+                text = values[0] if values else ''
+            elif field == 'values':
+                text = '_'.join(f'{axis.name}={value}' if config.includeParamName else value
+                                for axis, value in zip(config.axes, values))
+            elif field == 'object':
+                text = self.safeUnits[unitName]
+            else:
+                text = config.prefix if field == 'prefix' else config.suffix
+            stem.append(format(text, spec))
+        
+        # Empty fields leave doubled or dangling separators behind
+        stem = re.sub(r'([_\- ])\1+', r'\1', ''.join(stem)).strip('_- ')
+        return (stem or f'variant_{variantIdx+1}') + fileExt
+    
+    def _row_filename(self, rowFilename, variantIdx, unitName, fileExt):
+        """Filename a variation table row sets; the object name is appended when several are exported"""
+        stem, ext = os.path.splitext(rowFilename)
+        stem = sanitize_filename(stem if ext.lower() in self.extensions else rowFilename)
+        if self.unitCount > 1:
+            stem = f'{stem}_{self.safeUnits[unitName]}' if stem else self.safeUnits[unitName]
+        return (stem or f'variant_{variantIdx+1}') + fileExt
+
+
+class FilenameFilter:
+    """Fixed-size Bloom filter of case-insensitive filenames.
+    
+    add() and might_contain() never miss a name that was added, and only
+    rarely report one that was not; memory stays at bits / 8 bytes however
+    many names are added.
+    """
+    def __init__(self, bits=FILENAME_FILTER_BITS, hashes=4):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray(bits // 8)
+    
+    def _positions(self, filename):
+        h = hash(filename.lower())
+        step = (h >> 32) | 1
+        return [(h + i * step) % self.bits for i in range(self.hashes)]
+    
+    def add(self, filename):
+        """Add a name; True if it may have been added before"""
+        seen = True
+        for position in self._positions(filename):
+            bit = 1 << (position & 7)
+            if not self.array[position >> 3] & bit:
+                seen = False
+                self.array[position >> 3] |= bit
+        return seen
+    
+    def might_contain(self, filename):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(filename))
+
+
+def iter_planned_filenames(config, units, builder):
+    """(variantIdx, unitName, format, filename) of every file of a run, before collisions are resolved"""
+    for variantIdx, combination in enumerate(config.iter_combinations()):
+        for unit in variant_units(units, combination):
+            for selectedFormat in config.formats:
+                yield variantIdx, unit.name, selectedFormat, builder.build(variantIdx, combination, unit.name, file_extension(selectedFormat))
+
+
+def resolve_filename_collisions(config, units, builder):
+    """Build every output filename up front and number the duplicates.
+    
+    Names are compared case-insensitively, as Windows and macOS do. The first
+    file keeps its name and later ones get _2, _3, ..., skipping names any
+    other file of the run has. Returns (renames, collisions): renames maps
+    (variantIdx, unitName, format) to the new filename and collisions lists
+    the names that clashed.
+    
+    A first pass finds names that may repeat with a FilenameFilter, so only
+    those are kept in memory; a second pass over the plan numbers them.
+    """
+    nameFilter = FilenameFilter()
+    candidates = set()
+    for variantIdx, unitName, selectedFormat, filename in iter_planned_filenames(config, units, builder):
+        if nameFilter.add(filename):
+            candidates.add(filename.lower())
+    
+    renames = {}
+    collisions = []
+    if not candidates:
+        return renames, collisions
+    seen = set()
+    for variantIdx, unitName, selectedFormat, filename in iter_planned_filenames(config, units, builder):
+        key = filename.lower()
+        if key not in candidates:
+            continue
+        if key not in seen:
+            seen.add(key)
+            continue
+        stem, ext = os.path.splitext(filename)
+        counter = 2
+        while nameFilter.might_contain(f'{stem}_{counter}{ext}'):
+            counter += 1
+        collisions.append(filename)
+        filename = f'{stem}_{counter}{ext}'
+        renames[(variantIdx, unitName, selectedFormat)] = filename
+        nameFilter.add(filename)
+    return renames, collisions
+
+
+class VariantJob:
+    """One variation: its parameter values and the files still to export"""
+    def __init__(self, index, combination, axes):
+        self.index = index
+        self.combination = combination
+        self.values = {axis.name: value for axis, value in zip(axes, combination)}
+        self.expressions = {axis.name: format_expression(value, axis.isText) for axis, value in zip(axes, combination)}
+        self.exports = []
+        self.skipped = 0
+        # COMPUTE_FULL or COMPUTE_INCREMENTAL once the variation has been computed with selective compute
+        self.computePath = None
+        # 0 for the first try, 1 and up for retries
+        self.attempt = 0
+    
+    @property
+    def label(self):
+        return ', '.join(self.combination)
+
+
+def iter_variant_ranges(config, variantRanges):
+    """(variantIdx, combination) pairs for (start, stop) ranges of variant indices.
+    
+    Ascending ranges share one pass over the combinations; a range that
+    starts before the previous one ended restarts from the beginning.
+    """
+    variants = None
+    position = 0
+    for start, stop in variantRanges:
+        if variants is None or start < position:
+            variants = enumerate(config.iter_combinations())
+            position = 0
+        yield from itertools.islice(variants, start - position, stop - position)
+        position = max(stop, start)
+
+
+def plan_variants(config, units, previousManifest=None, variantRanges=None, builder=None, renames=None, onlyFiles=None):
+    """Lazily yield a VariantJob per combination, leaving out files the manifest records as complete.
+    
+    variantRanges limits the plan to (start, stop) ranges of variant
+    indices, such as the chunks a farm worker claims. renames holds the
+    filenames resolve_filename_collisions changed. onlyFiles limits the
+    exports to a set of filenames, such as the failed-files job.
+    """
+    previousManifest = previousManifest or {}
+    builder = builder or FilenameBuilder(config, units)
+    renames = renames or {}
+    exportKeys = {selectedFormat: config.export_key(selectedFormat) for selectedFormat in config.formats}
+    if variantRanges is None:
+        variants = enumerate(config.iter_combinations())
+    else:
+        variants = iter_variant_ranges(config, variantRanges)
+    
+    for variantIdx, combination in variants:
+        job = VariantJob(variantIdx, combination, config.axes)
+        
+        for unit in variant_units(units, combination):
+            for selectedFormat in config.formats:
+                filename = (renames.get((variantIdx, unit.name, selectedFormat)) or
+                            builder.build(variantIdx, combination, unit.name, file_extension(selectedFormat)))
+                if onlyFiles is not None and filename not in onlyFiles:
+                    continue
+                
+                previousEntry = previousManifest.get(filename)
+                if previousEntry and (config.runMode == RUN_RESUME or (
+                        previousEntry['expressions'] == job.expressions and
+                        previousEntry['options'] == exportKeys[selectedFormat])):
+                    if is_manifest_entry_valid(config.outputFolder, previousEntry):
+                        job.skipped += 1
+                        continue
+                
+                job.exports.append((unit, filename, selectedFormat))
+        
+        yield job
+
+
+def percentile(sortedValues, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sortedValues:
+        return 0.0
+    rank = max(1, int(fraction * len(sortedValues) + 0.999999))
+    return sortedValues[min(rank, len(sortedValues)) - 1]
+
+
+class RunningStats:
+    """Count, total and maximum of a series, with percentiles from a bounded random sample.
+    
+    Percentiles are exact until more than reservoirSize values were added.
+    """
+    def __init__(self, reservoirSize=TIMING_RESERVOIR_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.reservoirSize = reservoirSize
+        self.reservoir = array('d')
+        self.random = random.Random(0)
+    
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = value if self.count == 1 else max(self.max, value)
+        if len(self.reservoir) < self.reservoirSize:
+            self.reservoir.append(value)
+        else:
+            slot = self.random.randrange(self.count)
+            if slot < self.reservoirSize:
+                self.reservoir[slot] = value
+    
+    def percentile(self, fraction):
+        return percentile(sorted(self.reservoir), fraction)
+
+
+class StageTimings:
+    """Wall-clock time of every stage of the export loop.
+    
+    Each measurement is appended to batch_timing.csv once open_report was
+    called; only per-stage aggregates stay in memory.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.fileSizes = RunningStats()
+        self.csvFile = None
+        self.writer = None
+    
+    def open_report(self, outputFolder, workerId=''):
+        """Start batch_timing.csv, one row per measurement"""
+        self.csvFile = open(os.path.join(outputFolder, worker_file(TIMING_CSV_FILE, workerId)), 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.csvFile)
+        self.writer.writerow(['variant', 'object', 'stage', 'seconds', 'file_size'])
+        
+    def add(self, variantIdx, unitName, stage, seconds, fileSize=None):
+        if stage not in self.stages:
+            self.stages[stage] = RunningStats()
+        self.stages[stage].add(seconds)
+        if fileSize is not None:
+            self.fileSizes.add(fileSize)
+        if self.writer:
+            self.writer.writerow([variantIdx + 1, unitName or '', stage, f'{seconds:.6f}', '' if fileSize is None else fileSize])
+        
+    def stats(self):
+        """count/total/p50/p95/max seconds per stage"""
+        stats = {}
+        for stage in STAGES + sorted(set(self.stages) - set(STAGES)):
+            if stage not in self.stages:
+                continue
+            stageStats = self.stages[stage]
+            stats[stage] = {
+                'count': stageStats.count,
+                'total': stageStats.total,
+                'p50': stageStats.percentile(0.50),
+                'p95': stageStats.percentile(0.95),
+                'max': stageStats.max
+            }
+        return stats
+    
+    def summary(self):
+        """One line per stage for the final message box"""
+        lines = []
+        for stage, stat in self.stats().items():
+            lines.append(f'{stage}: p50 {stat["p50"]:.3f}s, p95 {stat["p95"]:.3f}s, max {stat["max"]:.3f}s')
+        return '\n'.join(lines)
+    
+    def write_report(self, outputFolder, workerId=''):
+        """Close batch_timing.csv and write batch_timing.json (stats and file sizes)"""
+        if self.csvFile:
+            self.csvFile.close()
+            self.csvFile = self.writer = None
+        
+        fileSizes = self.fileSizes
+        report = {
+            'stages': self.stats(),
+            'files': {
+                'count': fileSizes.count,
+                'total_bytes': int(fileSizes.total),
+                'p50_bytes': int(fileSizes.percentile(0.50)),
+                'max_bytes': int(fileSizes.max)
+            }
+        }
+        with open(os.path.join(outputFolder, worker_file(TIMING_JSON_FILE, workerId)), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+
+
+class BatchResult:
+    """Counters collected while a batch runs"""
+    def __init__(self, totalOperations):
+        self.totalOperations = totalOperations
+        self.successCount = 0
+        self.skippedCount = 0
+        self.cacheHits = 0
+        self.cacheMisses = 0
+        self.waitCount = 0
+        self.waitSeconds = 0.0
+        self.waitMax = 0.0
+        self.timeoutCount = 0
+        self.cancelled = False
+        self.timings = StageTimings()
+        self.elapsed = 0.0
+        self.postprocessKind = 'inline'
+        self.backpressureWaits = 0
+        self.backpressureSeconds = 0.0
+        self.tessellations = 0
+        self.meshWrites = 0
+        self.renamedFiles = 0
+        self.meshChecked = 0
+        self.meshFailures = []
+        self.archivePath = None
+        self.archiveErrors = []
+        # Failure records (see make_failure_record), including failures a retry recovered
+        self.failures = []
+        self.retriedFiles = 0
+        self.recoveredFiles = 0
+        self.failedFiles = 0
+        self.computePaths = {}
+        self.meshSettingsSearched = 0
+        self.meshSettingsCached = 0
+        self.computeFallbacks = {}
+        # Variations exported, files and bytes stored, and time spent outside the loop, for the cost model
+        self.exportedVariants = 0
+        self.storedFiles = 0
+        self.storedBytes = 0
+        self.setupSeconds = 0.0
+    
+    def summary(self, config, objectsPerFile=1):
+        """Text for the final message box"""
+        doneMsg = f'Done!\n\nExported {self.successCount} of {self.totalOperations} files'
+        if objectsPerFile > 1:
+            doneMsg += f' ({objectsPerFile} objects per file)'
+        if self.skippedCount:
+            doneMsg += f'\nAlready complete (skipped): {self.skippedCount}'
+        if self.renamedFiles:
+            doneMsg += f'\nNumbered {self.renamedFiles} file(s) whose names would have collided'
+        if config.reuseDuplicates:
+            doneMsg += f'\nIdentical geometry: {self.cacheHits} reused, {self.cacheMisses} exported'
+        if self.waitCount:
+            doneMsg += f'\n\nCompute wait: avg {self.waitSeconds / self.waitCount:.3f}s, max {self.waitMax:.3f}s'
+        if self.computePaths:
+            doneMsg += (f'\nCompute: {self.computePaths.get(COMPUTE_INCREMENTAL, 0)} incremental, '
+                        f'{self.computePaths.get(COMPUTE_FULL, 0)} full')
+            for reason, count in sorted(self.computeFallbacks.items(), key=lambda item: -item[1])[:5]:
+                doneMsg += f'\n  full compute ({count}x): {reason}'
+        if self.timeoutCount:
+            doneMsg += f'\nCompute timed out for {self.timeoutCount} variation(s)'
+        if self.meshSettingsSearched or self.meshSettingsCached:
+            doneMsg += (f'\nAdaptive mesh settings: {self.meshSettingsSearched} chosen, '
+                        f'{self.meshSettingsCached} from the cache')
+        if self.meshWrites:
+            doneMsg += f'\nTessellated {self.tessellations} time(s) for {self.meshWrites} mesh file(s)'
+        if config.postprocessWorkers:
+            doneMsg += f'\n\nPost-processing: {config.postprocessWorkers} {self.postprocessKind}'
+            if self.backpressureWaits:
+                doneMsg += f', export loop waited {self.backpressureWaits} times ({self.backpressureSeconds:.1f}s) for a free slot'
+        if self.failures:
+            doneMsg += f'\n\nFailures: {len(self.failures)} recorded in {FAILURES_FILE}'
+            if self.retriedFiles:
+                doneMsg += f'\nRetried {self.retriedFiles} file(s), {self.recoveredFiles} recovered'
+            if self.failedFiles:
+                doneMsg += f'\n{self.failedFiles} file(s) still failing; "Retry failed files only" re-runs them from {FAILED_JOB_FILE}'
+            for failure in self.failures[-10:]:
+                doneMsg += f"\n  {failure['path'] or ', '.join(map(str, failure['variant'].values()))} [{failure['stage']}]: {failure['error']}"
+        if config.validateMeshes:
+            doneMsg += f'\n\nMesh validation: {self.meshChecked} STL file(s) checked, {len(self.meshFailures)} failed'
+            for filename, problems in self.meshFailures[:10]:
+                doneMsg += f'\n  {filename}: {", ".join(problems)}'
+            if len(self.meshFailures) > 10:
+                doneMsg += f'\n  ... and {len(self.meshFailures) - 10} more'
+        if self.archivePath:
+            doneMsg += f'\n\nArchive: {os.path.basename(self.archivePath)}'
+            if self.archiveErrors:
+                doneMsg += f'\nCould not archive {len(self.archiveErrors)} file(s):'
+                for filename, error in self.archiveErrors[:10]:
+                    doneMsg += f'\n  {filename}: {error}'
+                if len(self.archiveErrors) > 10:
+                    doneMsg += f'\n  ... and {len(self.archiveErrors) - 10} more'
+        if self.timings.stages:
+            doneMsg += f'\n\nTotal time: {self.elapsed:.1f}s\n' + self.timings.summary()
+        return doneMsg
+
+
+def sample_variant_indices(variantCount, sampleCount):
+    """Variant indices spread evenly over a sweep, including the first and last"""
+    if sampleCount >= variantCount:
+        return list(range(variantCount))
+    if sampleCount <= 1:
+        return [0]
+    step = (variantCount - 1) / (sampleCount - 1)
+    return sorted({round(i * step) for i in range(sampleCount)})
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f'{seconds}s'
+    if seconds < 3600:
+        return f'{seconds // 60}m {seconds % 60:02}s'
+    return f'{seconds // 3600}h {seconds % 3600 // 60:02}m'
+
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024 or unit == 'GB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024.0
+
+
+class CostModel:
+    """Seconds per variation and bytes per file measured by earlier runs and samples.
+    
+    Kept as JSON in the home folder, keyed by design, objects, formats and
+    post-processing. New measurements are averaged with the earlier ones,
+    weighted by the number of variations, with old data capped so the
+    model follows changes to the design.
+    """
+    HISTORY_VARIANTS = 50
+    
+    def __init__(self, path=COST_MODEL_FILE):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+    
+    @staticmethod
+    def key(config, units, designName=''):
+        """Everything that changes how long a variation takes or how large its files are"""
+        formats = '+'.join(config.export_key(selectedFormat) for selectedFormat in config.formats)
+        post = f'binary={config.binaryStl}|gzip={config.gzipOutput}|archive={config.archiveFormat}|validate={config.validateMeshes}'
+        return f'{designName}|{len(units)} objects|combined={config.combineObjects}|fast={config.fastMode}|selective={config.selectiveCompute}|{formats}|{post}'
+    
+    def record(self, key, result):
+        """Fold a finished run or sample into the model; returns False when it exported nothing"""
+        if not result.exportedVariants or not result.storedFiles:
+            return False
+        secondsPerVariant = max(0.0, result.elapsed - result.setupSeconds) / result.exportedVariants
+        bytesPerFile = result.storedBytes / result.storedFiles
+        
+        entry = self.entries.get(key)
+        if entry:
+            previous = min(entry['variants'], self.HISTORY_VARIANTS)
+            weight = result.exportedVariants / (previous + result.exportedVariants)
+            secondsPerVariant = entry['secondsPerVariant'] + weight * (secondsPerVariant - entry['secondsPerVariant'])
+            bytesPerFile = entry['bytesPerFile'] + weight * (bytesPerFile - entry['bytesPerFile'])
+        self.entries[key] = {
+            'secondsPerVariant': secondsPerVariant,
+            'bytesPerFile': bytesPerFile,
+            'setupSeconds': result.setupSeconds,
+            'variants': (entry['variants'] if entry else 0) + result.exportedVariants,
+            'runs': (entry['runs'] if entry else 0) + 1,
+            'updated': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        return True
+    
+    def estimate(self, key, variantCount, fileCount):
+        """(seconds, bytes, runs) expected for a sweep, or None without earlier measurements"""
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+        seconds = entry['setupSeconds'] + entry['secondsPerVariant'] * variantCount
+        return seconds, entry['bytesPerFile'] * fileCount, entry['runs']
+    
+    def save(self):
+        tempPath = f'{self.path}.{os.getpid()}.tmp'
+        with open(tempPath, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tempPath, self.path)
+
+
+class ExportBackend:
+    """Everything the batch loop asks of the CAD application"""
+    def begin(self, config, units):
+        """Called once before the first variation"""
+        pass
+    
+    def set_parameter(self, axis, expression):
+        raise NotImplementedError
+    
+    def compute(self):
+        raise NotImplementedError
+    
+    def compute_changed(self, changedAxes):
+        """Recompute after the parameters of changedAxes were set, as cheaply as is safe.
+        
+        Returns (path, reason): COMPUTE_INCREMENTAL when the change needed
+        no full recompute, or COMPUTE_FULL and why it was needed.
+        """
+        self.compute()
+        return COMPUTE_FULL, 'not supported by the backend'
+    
+    def wait_for_compute(self, timeout):
+        """Wait for compute to settle; returns (settled, secondsWaited)"""
+        return True, 0.0
+    
+    def refresh(self):
+        """Redraw the viewport after a variation; skipped in fast mode"""
+        pass
+    
+    def fingerprint(self, unit, exportKey):
+        raise NotImplementedError
+    
+    def export(self, unit, config, fullPath, selectedFormat, meshSettings=None):
+        """Write one file; meshSettings (a MeshSettings) replaces the refinement of mesh formats"""
+        raise NotImplementedError
+    
+    def tessellate(self, unit, config, meshSettings=None):
+        """Triangle mesh of a unit in centimeters (a mesh_io.TriangleMesh), for tessellate-once runs"""
+        raise NotImplementedError
+    
+    def bounding_diagonal(self, unit):
+        """Bounding box diagonal of a unit in centimeters, for adaptive refinement"""
+        raise NotImplementedError
+    
+    def triangle_count(self, unit, meshSettings):
+        """Triangles a unit tessellates into with meshSettings, for the adaptive search"""
+        raise NotImplementedError
+    
+    def finish(self, config):
+        """Called once after the last variation, also after failures"""
+        pass
+
+
+class ProgressReporter:
+    """Receives progress from the batch loop; the base class ignores it"""
+    def is_cancelled(self):
+        return False
+    
+    def update(self, value, message=None):
+        pass
+
+
+class ThrottledProgress(ProgressReporter):
+    """Forwards progress at most once per interval; the last value is always sent on flush"""
+    def __init__(self, progress, interval):
+        self.progress = progress
+        self.interval = interval
+        self.lastUpdate = None
+        self.pending = None
+        
+    def is_cancelled(self):
+        return self.progress.is_cancelled()
+    
+    def update(self, value, message=None):
+        now = time.perf_counter()
+        if self.lastUpdate is None or now - self.lastUpdate >= self.interval:
+            self.progress.update(value, message)
+            self.lastUpdate = now
+            self.pending = None
+        else:
+            self.pending = (value, message)
+            
+    def flush(self):
+        if self.pending:
+            self.progress.update(*self.pending)
+            self.pending = None
+
+
+class BatchExecutor:
+    """Runs the parameter-set / compute / export loop against a backend"""
+    def __init__(self, config, backend, progress=None):
+        self.config = config
+        self.backend = backend
+        self.progress = progress or ProgressReporter()
+        self.builder = None
+        self.renames = {}
+        self.collisions = []
+    
+    def prepare_names(self, units):
+        """Compile the filename template and resolve name collisions before anything is exported.
+        
+        Returns the filenames that collided; raises ValueError for a bad template.
+        """
+        self.builder = FilenameBuilder(self.config, units)
+        self.renames, self.collisions = resolve_filename_collisions(self.config, units, self.builder)
+        return self.collisions
+    
+    def total_operations(self, units):
+        if self.config.runMode == RUN_RETRY_FAILED:
+            return len(load_failed_job(self.config.outputFolder)[1])
+        if self.config.variationTable is not None and self.config.variationTable.hasObjects:
+            # Rows export different numbers of objects
+            return sum(len(variant_units(units, row)) for row in self.config.variationTable) * len(self.config.formats)
+        return self.config.combination_count() * len(units) * len(self.config.formats)
+    
+    def sample(self, units, sampleCount=3):
+        """Dry run: export a few variations spread over the sweep into a temporary folder.
+        
+        Uses the same formats and post-processing but no reuse, copying or
+        farm. Returns the BatchResult of the sample; raises ValueError when
+        a sample fails, so a broken sweep stops before the long run.
+        """
+        sampleFolder = tempfile.mkdtemp(prefix='batch_sample_')
+        try:
+            config = copy.copy(self.config)
+            config.outputFolder = sampleFolder
+            config.exportFolder = os.path.join(sampleFolder, ARCHIVE_STAGING_FOLDER) if config.archiveFormat else sampleFolder
+            config.runMode = RUN_EXPORT_ALL
+            config.reuseDuplicates = False
+            config.copyToFolder = ''
+            config.workerId = ''
+            config.postprocessWorkers = 0
+            config.retryPolicy = RetryPolicy()
+            executor = BatchExecutor(config, self.backend, self.progress)
+            executor.builder, executor.renames = self.builder, self.renames
+            
+            indices = sample_variant_indices(config.combination_count(), sampleCount)
+            sampleRanges = [(idx, idx + 1) for idx in indices]
+            result = executor.run(units, sampleRanges)
+        finally:
+            shutil.rmtree(sampleFolder, ignore_errors=True)
+        
+        if result.cancelled:
+            raise ValueError('The dry run was cancelled')
+        problems = [(failure['path'] or failure['stage'], failure['error']) for failure in result.failures] + result.archiveErrors
+        # Variation table rows may export only some of the objects
+        expected = sum(len(variant_units(units, combination))
+                       for variantIdx, combination in iter_variant_ranges(config, sampleRanges)) * len(config.formats)
+        if problems or result.successCount < expected:
+            message = f'{expected - result.successCount} of {expected} sample exports failed:'
+            message += ''.join(f'\n  {name}: {error}' for name, error in problems[:10])
+            raise ValueError(message)
+        return result
+    
+    def run(self, units, variantRanges=None):
+        """Export every planned file; variantRanges limits the run to ranges of variant indices"""
+        config = self.config
+        backend = self.backend
+        progress = self.progress
+        if config.fastMode:
+            progress = ThrottledProgress(progress, config.progressInterval)
+        result = BatchResult(self.total_operations(units))
+        timings = result.timings
+        runStart = time.perf_counter()
+        
+        previousManifest = load_manifest(config.outputFolder) if config.runMode != RUN_EXPORT_ALL else {}
+        # Entries of earlier runs are used only with their size and checksum (older caches had neither)
+        self.geometryCache = {}
+        if config.reuseDuplicates:
+            self.geometryCache = {fingerprint: entry for fingerprint, entry in load_geometry_cache(config.outputFolder).items()
+                                  if isinstance(entry, dict) and 'sha256' in entry}
+        # Fingerprint each file currently holds, to drop entries whose file is overwritten
+        self.cachedFingerprints = {entry['file']: fingerprint for fingerprint, entry in self.geometryCache.items()}
+        # Entries whose file was checksummed or written by this run; they are not hashed again
+        self.checkedFingerprints = set()
+        # Adaptive mesh settings chosen earlier, by geometry fingerprint
+        self.meshSettingsCache = load_geometry_cache(config.outputFolder, MESH_SETTINGS_FILE) if config.adaptiveMesh else {}
+        onlyFiles = None
+        # Lines of the failed-files job and the files of it this run has reached (retry runs only)
+        self.failedEntries = []
+        self.reachedFiles = set()
+        if config.runMode == RUN_RETRY_FAILED:
+            self.failedEntries = load_failed_entries(config.outputFolder)
+            failedRanges, onlyFiles = load_failed_job(config.outputFolder, self.failedEntries)
+            variantRanges = variantRanges if variantRanges is not None else failedRanges
+        
+        self.manifestFile = open(os.path.join(config.outputFolder, worker_file(MANIFEST_FILE, config.workerId)), 'a', encoding='utf-8')
+        try:
+            timings.open_report(config.outputFolder, config.workerId)
+        except OSError:
+            pass
+        
+        # Finished files are handed to a bounded post-processing pool
+        self.pool = None
+        self.pending = {}
+        if config.postprocessWorkers > 0:
+            self.pool, result.postprocessKind = create_postprocess_pool(config.postprocessWorkers)
+        
+        # Post-processed files are streamed into the archive by a background thread
+        self.archive = None
+        # Size and checksum of archived files, for reusing them (only kept with reuseDuplicates)
+        self.archivedFiles = {}
+        if config.archiveFormat:
+            os.makedirs(config.exportFolder, exist_ok=True)
+            archiveName = f'batch_export_{time.strftime("%Y%m%d_%H%M%S")}{"_" + config.workerId if config.workerId else ""}'
+            result.archivePath = os.path.join(config.outputFolder, archiveName + archive_io.archive_extension(config.archiveFormat))
+            self.archive = archive_io.ArchiveWriter(result.archivePath, config.archiveFormat,
+                                                    maxPending=2 * max(1, config.postprocessWorkers))
+        
+        if self.builder is None:
+            self.prepare_names(units)
+        result.renamedFiles = len(self.collisions)
+        plan = plan_variants(config, units, previousManifest, variantRanges, self.builder, self.renames, onlyFiles)
+        start = time.perf_counter()
+        backend.begin(config, units)
+        result.setupSeconds += time.perf_counter() - start
+        self.attemptConfigs = {0: config}
+        self.failedJobs = {}
+        self.failuresFile = None
+        self.previousCombination = None
+        self.currentProgress = 0
+        try:
+            for job in plan:
+                if progress.is_cancelled():
+                    result.cancelled = True
+                    break
+                
+                result.skippedCount += job.skipped
+                result.successCount += job.skipped
+                self.currentProgress += job.skipped
+                if not job.exports:
+                    progress.update(self.currentProgress)
+                    continue
+                self._run_job(job, progress, result)
+            
+            # Retry what failed, relaxing the settings further with every attempt
+            for attempt in range(1, config.retryPolicy.attempts + 1):
+                if self.pool:
+                    # Post-processing failures are retried too
+                    self._collect_postprocess(result, block=True)
+                if not self.failedJobs or result.cancelled:
+                    break
+                retryJobs = sorted(self.failedJobs.values(), key=lambda job: job.index)
+                self.failedJobs = {}
+                for position, job in enumerate(retryJobs):
+                    if progress.is_cancelled():
+                        result.cancelled = True
+                        # Files not retried yet are still failing
+                        for skippedJob in retryJobs[position:]:
+                            for unit, filename, selectedFormat in skippedJob.exports:
+                                self._add_failed(skippedJob, unit, filename, selectedFormat)
+                        break
+                    job.attempt = attempt
+                    result.retriedFiles += len(job.exports)
+                    self._run_job(job, progress, result)
+        finally:
+            # Closing the plan also hands an unfinished farm chunk back to the queue
+            plan.close()
+            if config.fastMode:
+                progress.flush()
+            start = time.perf_counter()
+            backend.finish(config)
+            result.setupSeconds += time.perf_counter() - start
+            if self.pool:
+                self._collect_postprocess(result, block=True)
+                self.pool.shutdown()
+                self.pool = None
+            if self.archive:
+                self.archive.close()
+                result.archiveErrors = self.archive.errors
+                self.archive = None
+                result.storedBytes = os.path.getsize(result.archivePath)
+                try:
+                    os.rmdir(config.exportFolder)
+                except OSError:
+                    pass
+            self.manifestFile.close()
+            if self.failuresFile:
+                self.failuresFile.close()
+            result.failedFiles = sum(len(job.exports) for job in self.failedJobs.values())
+            keptEntries = []
+            if result.cancelled:
+                # A cancelled retry run keeps the part of the job it did not reach
+                for entry in self.failedEntries:
+                    files = [file for file in entry['files'] if file['path'] not in self.reachedFiles]
+                    keptEntries.append(dict(entry, files=files))
+                result.failedFiles += sum(len(entry['files']) for entry in keptEntries)
+            try:
+                write_failed_job(config.outputFolder, self.failedJobs.values(), config.workerId, keptEntries)
+            except OSError:
+                pass
+            if config.reuseDuplicates:
+                try:
+                    geometryCache = self.geometryCache
+                    if config.workerId:
+                        # Keep what other workers added since this run started
+                        geometryCache = dict(load_geometry_cache(config.outputFolder), **geometryCache)
+                    save_geometry_cache(config.outputFolder, geometryCache)
+                except OSError:
+                    pass
+            if config.adaptiveMesh:
+                try:
+                    if config.workerId:
+                        self.meshSettingsCache = dict(load_geometry_cache(config.outputFolder, MESH_SETTINGS_FILE), **self.meshSettingsCache)
+                    save_geometry_cache(config.outputFolder, self.meshSettingsCache, MESH_SETTINGS_FILE)
+                except OSError:
+                    pass
+            result.elapsed = time.perf_counter() - runStart
+            try:
+                timings.write_report(config.outputFolder, config.workerId)
+            except OSError:
+                pass
+        
+        return result
+    
+    def _run_job(self, job, progress, result):
+        """Set the parameters of one variation, compute it and export its files"""
+        config = self._job_config(job)
+        backend = self.backend
+        timings = result.timings
+        variantStart = time.perf_counter()
+        try:
+            # Update only the parameters that changed since the previous combination
+            self._enter_stage('parameters')
+            changedAxes = []
+            for axisIdx, axis in enumerate(config.axes):
+                if self.previousCombination is None or self.previousCombination[axisIdx] != job.combination[axisIdx]:
+                    backend.set_parameter(axis, job.expressions[axis.name])
+                    changedAxes.append(axis)
+            self.previousCombination = job.combination
+            timings.add(job.index, None, 'parameters', time.perf_counter() - self.stageStart)
+            
+            self._enter_stage('compute')
+            if config.selectiveCompute:
+                job.computePath, reason = backend.compute_changed(changedAxes)
+                result.computePaths[job.computePath] = result.computePaths.get(job.computePath, 0) + 1
+                if reason:
+                    result.computeFallbacks[reason] = result.computeFallbacks.get(reason, 0) + 1
+            else:
+                backend.compute()
+            timings.add(job.index, None, 'compute', time.perf_counter() - self.stageStart)
+            
+            # Wait for compute to settle
+            self._enter_stage('wait')
+            settled, waited = backend.wait_for_compute(config.computeTimeout)
+            timings.add(job.index, None, 'wait', time.perf_counter() - self.stageStart)
+            result.waitCount += 1
+            result.waitSeconds += waited
+            result.waitMax = max(result.waitMax, waited)
+            if not settled:
+                result.timeoutCount += 1
+            
+            if not config.fastMode:
+                self._enter_stage('refresh')
+                backend.refresh()
+                timings.add(job.index, None, 'refresh', time.perf_counter() - self.stageStart)
+        
+        except Exception as e:
+            # Parameter state is unknown after a failure, so set every parameter next time
+            self.previousCombination = None
+            if not job.attempt:
+                self.currentProgress += len(job.exports)
+            self._record_failure(job, None, e, result, variantStart)
+            for unit, filename, selectedFormat in job.exports:
+                if self.failedEntries:
+                    self.reachedFiles.add(filename)
+                self._add_failed(job, unit, filename, selectedFormat)
+            return
+        
+        # Export each unit in each format; meshes are shared within the variation
+        self.meshCache = {}
+        self.meshSettings = {}
+        for position, (unit, filename, selectedFormat) in enumerate(job.exports):
+            if progress.is_cancelled():
+                result.cancelled = True
+                if job.attempt:
+                    # Files of a retry that were not reached are still failing
+                    for unit, filename, selectedFormat in job.exports[position:]:
+                        self._add_failed(job, unit, filename, selectedFormat)
+                break
+            if self.failedEntries:
+                self.reachedFiles.add(filename)
+            
+            if job.attempt:
+                progress.update(self.currentProgress, f'Retrying ({job.attempt}): {job.label} - {unit.name}')
+            else:
+                self.currentProgress += 1
+                progress.update(self.currentProgress, f'Exporting: {job.label} - {unit.name}')
+            
+            try:
+                self._export_unit(job, unit, filename, selectedFormat, result)
+            except Exception as e:
+                self._record_failure(job, (unit.name, filename, selectedFormat), e, result, variantStart)
+                self._add_failed(job, unit, filename, selectedFormat)
+        if not job.attempt:
+            result.exportedVariants += 1
+    
+    def _job_config(self, job):
+        """Config of a job's attempt; retries relax it according to the retry policy"""
+        if job.attempt not in self.attemptConfigs:
+            self.attemptConfigs[job.attempt] = self.config.retryPolicy.config_for(self.config, job.attempt)
+        return self.attemptConfigs[job.attempt]
+    
+    def _enter_stage(self, stage):
+        """Remember the running stage, so a failure can name it"""
+        self.stage = stage
+        self.stageStart = time.perf_counter()
+    
+    def _record_failure(self, job, file, error, result, variantStart=None, stage=None, tracebackText=''):
+        """Log a failure with its stage, traceback, parameter values and timing to batch_failures.jsonl.
+        
+        file is (unitName, filename, selectedFormat), or None for the whole
+        variation. error is the exception, or a message with tracebackText.
+        Without stage, the failure happened in the running stage.
+        """
+        now = time.perf_counter()
+        if isinstance(error, BaseException):
+            tracebackText = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+            error = f'{type(error).__name__}: {error}'
+        unitName, filename, selectedFormat = file or (None, None, None)
+        record = make_failure_record(
+            job.index, job.values, job.expressions, unitName, filename, selectedFormat, stage or self.stage,
+            error, tracebackText, 0.0 if stage else now - self.stageStart, now - variantStart if variantStart else 0.0,
+            job.attempt)
+        result.failures.append(record)
+        try:
+            if self.failuresFile is None:
+                self.failuresFile = open(os.path.join(self.config.outputFolder, worker_file(FAILURES_FILE, self.config.workerId)),
+                                         'a', encoding='utf-8')
+            self.failuresFile.write(json.dumps(record) + '\n')
+            self.failuresFile.flush()
+        except OSError:
+            pass
+    
+    def _add_failed(self, job, unit, filename, selectedFormat):
+        """Queue a file for the retry pass and the failed-files job"""
+        retryJob = self.failedJobs.get(job.index)
+        if retryJob is None:
+            retryJob = self.failedJobs[job.index] = VariantJob(job.index, job.combination, self.config.axes)
+        if not any(queued[1] == filename for queued in retryJob.exports):
+            retryJob.exports.append((unit, filename, selectedFormat))
+    
+    def _export_unit(self, job, unit, filename, selectedFormat, result):
+        """Export (or reuse) one file and hand it to post-processing"""
+        config = self._job_config(job)
+        timings = result.timings
+        fullPath = os.path.join(config.exportFolder, filename)
+        exportKey = config.export_key(selectedFormat)
+        reuseDuplicates = config.reuseDuplicates and 'F3D' not in selectedFormat
+        
+        # Reuse an earlier file with identical geometry
+        cachedPath = None
+        fingerprint = None
+        if reuseDuplicates:
+            self._enter_stage('fingerprint')
+            fingerprint = self.backend.fingerprint(unit, exportKey)
+            timings.add(job.index, unit.name, 'fingerprint', time.perf_counter() - self.stageStart)
+            cachedEntry = self.geometryCache.get(fingerprint)
+            cachedFile = cachedEntry['file'] if cachedEntry else None
+            if cachedFile in self.archivedFiles:
+                self._archive_alias(job, unit, filename, selectedFormat, cachedFile, exportKey, result)
+                return
+            if cachedFile and (fingerprint in self.checkedFingerprints or is_cache_entry_valid(config.exportFolder, cachedEntry)):
+                cachedPath = os.path.join(config.exportFolder, cachedFile)
+                if 'sha256' in cachedEntry:
+                    self.checkedFingerprints.add(fingerprint)
+            
+            # Whatever was cached for the file being replaced no longer describes it
+            previousFingerprint = self.cachedFingerprints.get(filename)
+            if previousFingerprint is not None and previousFingerprint != fingerprint:
+                self.geometryCache.pop(previousFingerprint, None)
+                self.checkedFingerprints.discard(previousFingerprint)
+                del self.cachedFingerprints[filename]
+        
+        if cachedPath:
+            self._enter_stage('reuse')
+            reuse_export(cachedPath, fullPath)
+            timings.add(job.index, unit.name, 'reuse', time.perf_counter() - self.stageStart, os.path.getsize(fullPath))
+            result.cacheHits += 1
+        else:
+            meshSettings = self._mesh_settings(job, unit, result) if config.adaptiveMesh and is_mesh_format(selectedFormat) else None
+            remove_export(fullPath)
+            if config.tessellateOnce and is_mesh_format(selectedFormat):
+                mesh = self._unit_mesh(job, unit, result, meshSettings)
+                self._enter_stage('export')
+                mesh_io.write_mesh(fullPath, mesh, selectedFormat, config.selectedUnit)
+                result.meshWrites += 1
+            else:
+                self._enter_stage('export')
+                self.backend.export(unit, config, fullPath, selectedFormat, meshSettings)
+            timings.add(job.index, unit.name, 'export', time.perf_counter() - self.stageStart, os.path.getsize(fullPath))
+            if reuseDuplicates:
+                result.cacheMisses += 1
+                # Size and checksum are added once post-processing has finished the file
+                self.geometryCache[fingerprint] = {'file': filename}
+                self.cachedFingerprints[filename] = fingerprint
+        
+        task = make_postprocess_task(config, filename)
+        record = (job, unit, selectedFormat, exportKey, None if cachedPath else fingerprint)
+        if not self.pool:
+            self._finish_postprocess(postprocess_file(task), record, result)
+            return
+        
+        # Backpressure: wait for a free slot instead of queueing without bound
+        if len(self.pending) >= 2 * config.postprocessWorkers:
+            start = time.perf_counter()
+            concurrent.futures.wait(self.pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            waited = time.perf_counter() - start
+            timings.add(job.index, unit.name, 'backpressure', waited)
+            result.backpressureWaits += 1
+            result.backpressureSeconds += waited
+        self._collect_postprocess(result)
+        self.pending[self.pool.submit(postprocess_file, task)] = record
+        
+    def _archive_alias(self, job, unit, filename, selectedFormat, cachedFile, exportKey, result):
+        """Store a file with the same geometry as an archived one as a link to it"""
+        start = time.perf_counter()
+        self.archive.add_alias(filename, cachedFile)
+        result.timings.add(job.index, unit.name, 'reuse', time.perf_counter() - start)
+        result.cacheHits += 1
+        size, sha256 = self.archivedFiles[cachedFile]
+        outcome = {'filename': filename, 'stored': filename, 'error': None, 'size': size, 'sha256': sha256, 'alias': True}
+        self._finish_postprocess(outcome, (job, unit, selectedFormat, exportKey, None), result)
+        
+    def _mesh_settings(self, job, unit, result):
+        """Adaptive mesh settings of a unit in the current variation, from the cache or a new search"""
+        if unit.name not in self.meshSettings:
+            config = self._job_config(job)
+            self._enter_stage('refine')
+            fingerprint = self.backend.fingerprint(unit, config.meshSettingsKey)
+            cached = self.meshSettingsCache.get(fingerprint)
+            if cached:
+                self.meshSettings[unit.name] = MeshSettings.from_dict(cached)
+                result.meshSettingsCached += 1
+            else:
+                self.meshSettings[unit.name] = choose_mesh_settings(config, self.backend, unit)
+                self.meshSettingsCache[fingerprint] = self.meshSettings[unit.name].to_dict()
+                result.meshSettingsSearched += 1
+            result.timings.add(job.index, unit.name, 'refine', time.perf_counter() - self.stageStart)
+        return self.meshSettings[unit.name]
+        
+    def _unit_mesh(self, job, unit, result, meshSettings=None):
+        """Tessellate a unit on first use within the current variation"""
+        if unit.name not in self.meshCache:
+            self._enter_stage('tessellate')
+            self.meshCache[unit.name] = self.backend.tessellate(unit, self._job_config(job), meshSettings)
+            result.timings.add(job.index, unit.name, 'tessellate', time.perf_counter() - self.stageStart)
+            result.tessellations += 1
+        return self.meshCache[unit.name]
+        
+    def _collect_postprocess(self, result, block=False):
+        """Record finished post-processing tasks; with block, wait for all of them"""
+        if block and self.pending:
+            concurrent.futures.wait(self.pending)
+        for future in [f for f in self.pending if f.done()]:
+            record = self.pending.pop(future)
+            try:
+                outcome = future.result()
+            except Exception as e:
+                # The worker itself died (for example a broken process pool)
+                outcome = {'filename': None, 'error': f'{type(e).__name__}: {e}'}
+            self._finish_postprocess(outcome, record, result)
+            
+    def _finish_postprocess(self, outcome, record, result):
+        """Write the manifest entry for a post-processed file, or record its error"""
+        job, unit, selectedFormat, exportKey, fingerprint = record
+        cachedEntry = self.geometryCache.get(fingerprint) if fingerprint else None
+        if cachedEntry is not None and cachedEntry['file'] == outcome['filename']:
+            if outcome['error'] or outcome['stored'] != outcome['filename']:
+                # Failed, or compressed away from the cached name
+                del self.geometryCache[fingerprint]
+                self.checkedFingerprints.discard(fingerprint)
+                self.cachedFingerprints.pop(outcome['filename'], None)
+            else:
+                cachedEntry['size'] = outcome['size']
+                cachedEntry['sha256'] = outcome['sha256']
+                self.checkedFingerprints.add(fingerprint)
+        if outcome['error']:
+            filename = outcome['filename']
+            self._record_failure(job, (unit.name, filename, selectedFormat), outcome['error'], result,
+                                 stage='postprocess', tracebackText=outcome.get('traceback', ''))
+            if filename:
+                self._add_failed(job, unit, filename, selectedFormat)
+            return
+        # A file counts as exported once it is complete, however many attempts it took
+        result.successCount += 1
+        if job.attempt:
+            result.recoveredFiles += 1
+        
+        if 'mesh' in outcome:
+            result.meshChecked += 1
+            if outcome['meshProblems']:
+                result.meshFailures.append((outcome['filename'], outcome['meshProblems']))
+        
+        entry = make_manifest_entry(
+            outcome['filename'], job.values, job.expressions, unit.name, exportKey,
+            outcome['size'], outcome['sha256'], outcome['stored'], outcome.get('mesh'), job.computePath)
+        
+        if self.archive:
+            if not outcome.get('alias'):
+                # Blocks while the archive thread is behind, which bounds the staged files
+                waited = self.archive.add(outcome['stored'], os.path.join(self.config.exportFolder, outcome['stored']))
+                result.timings.add(job.index, unit.name, 'archive', waited)
+                if self.config.reuseDuplicates:
+                    self.archivedFiles[outcome['filename']] = (outcome['size'], outcome['sha256'])
+                result.storedFiles += 1
+            entry['archive'] = os.path.basename(self.archive.path)
+        else:
+            result.storedFiles += 1
+            result.storedBytes += outcome['size']
+        
+        start = time.perf_counter()
+        self.manifestFile.write(json.dumps(entry) + '\n')
+        self.manifestFile.flush()
+        result.timings.add(job.index, unit.name, 'manifest', time.perf_counter() - start)
+
+
+class SimulatedBackend(ExportBackend):
+    """Backend that fakes compute and export latencies without Fusion.
+    
+    Files are written with deterministic content derived from the current
+    parameter expressions, so identical variations produce identical files
+    and fingerprints. busySeconds accumulates the simulated latency and
+    writeSeconds the time spent writing files, so callers can separate
+    backend time and disk I/O from loop overhead.
+    """
+    def __init__(self, computeSeconds=0.0, exportSeconds=0.0, fileSize=1024, jitter=0.0, seed=0, writeFiles=True,
+                 refreshSeconds=0.0, tessellateSeconds=0.0, meshSegments=32, incrementalSeconds=None):
+        self.computeSeconds = computeSeconds
+        # With selective compute, variations take this long instead of computeSeconds (None = always full)
+        self.incrementalSeconds = incrementalSeconds
+        self.exportSeconds = exportSeconds
+        self.refreshSeconds = refreshSeconds
+        self.tessellateSeconds = tessellateSeconds
+        self.meshSegments = meshSegments
+        self.fileSize = fileSize
+        self.jitter = jitter
+        self.writeFiles = writeFiles
+        self.random = random.Random(seed)
+        self.parameters = {}
+        self.busySeconds = 0.0
+        self.writeSeconds = 0.0
+        self.computeCount = 0
+        self.exportCount = 0
+        self.tessellateCount = 0
+    
+    def _sleep(self, seconds):
+        if self.jitter:
+            seconds *= 1.0 + self.random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+            self.busySeconds += seconds
+    
+    def begin(self, config, units):
+        for axis in config.axes:
+            self.parameters[axis.name] = axis.originalExpression
+    
+    def set_parameter(self, axis, expression):
+        self.parameters[axis.name] = expression
+    
+    def compute(self):
+        self.computeCount += 1
+        self._sleep(self.computeSeconds)
+    
+    def compute_changed(self, changedAxes):
+        if self.incrementalSeconds is None:
+            return super().compute_changed(changedAxes)
+        self.computeCount += 1
+        self._sleep(self.incrementalSeconds)
+        return COMPUTE_INCREMENTAL, None
+    
+    def refresh(self):
+        self._sleep(self.refreshSeconds)
+        
+    def fingerprint(self, unit, exportKey):
+        state = json.dumps(sorted(self.parameters.items()))
+        return hashlib.sha1(f'{exportKey}|{unit.name}|{state}'.encode('utf-8')).hexdigest()
+    
+    def export(self, unit, config, fullPath, selectedFormat, meshSettings=None):
+        self.exportCount += 1
+        self._sleep(self.exportSeconds)
+        if self.writeFiles:
+            seed = self.fingerprint(unit, config.export_key(selectedFormat)).encode('ascii')
+            # With adaptive settings the size follows the triangle count, as for a binary STL
+            fileSize = self.fileSize if meshSettings is None else 84 + 50 * self.triangle_count(unit, meshSettings)
+            start = time.perf_counter()
+            with open(fullPath, 'wb') as f:
+                f.write((seed * (fileSize // len(seed) + 1))[:fileSize])
+            self.writeSeconds += time.perf_counter() - start
+                
+    def _radius(self, unit):
+        # A sphere whose radius follows the parameter state, so variations differ
+        return 1.0 + int(self.fingerprint(unit, '')[:4], 16) / 65536.0
+    
+    def _segments(self, unit, meshSettings):
+        """Sphere segments that keep chord error, normal and edge length within meshSettings"""
+        if meshSettings is None:
+            return self.meshSegments
+        radius = self._radius(unit)
+        angle = min(math.sqrt(8 * meshSettings.surfaceDeviation / radius), meshSettings.normalDeviation,
+                    meshSettings.maxEdgeLength / radius)
+        return max(4, int(math.ceil(2 * math.pi / max(angle, 1e-3))))
+    
+    def tessellate(self, unit, config, meshSettings=None):
+        self.tessellateCount += 1
+        self._sleep(self.tessellateSeconds)
+        return mesh_io.uv_sphere(self._radius(unit), self._segments(unit, meshSettings))
+    
+    def bounding_diagonal(self, unit):
+        return 2 * math.sqrt(3) * self._radius(unit)
+    
+    def triangle_count(self, unit, meshSettings):
+        segments = self._segments(unit, meshSettings)
+        return 2 * segments * (segments // 2 - 1)
+    
+    def finish(self, config):
+        for axis in config.axes:
+            self.parameters[axis.name] = axis.originalExpression
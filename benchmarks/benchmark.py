@@ -0,0 +1,257 @@
+"""Benchmark the batch export loop against a synthetic workload.
+
+Runs BatchExecutor with SimulatedBackend (no Fusion needed) and measures
+throughput, loop overhead per variant with the simulated backend time and
+file writes taken out, peak memory and how these scale with the number of
+variants and objects. Filename building and planning are timed on their
+own. Every case is repeated and the median run counts. --compare-modes
+also runs one case in fast and normal mode (with the simulated viewport
+refresh of --refresh-ms) and reports the speedup. Results are written
+as JSON; pass --baseline to compare against an earlier result file and
+fail on regressions larger than the noise of the runs.
+
+    python benchmarks/benchmark.py --output results.json
+    python benchmarks/benchmark.py --full --baseline results.json
+    python benchmarks/benchmark.py --compare-modes --compute-ms 5 --refresh-ms 20
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_core
+
+# Cases of a few milliseconds are mostly timer and scheduler noise, so the smallest has 100 variants
+QUICK_VARIANTS = [100, 1000, 10000]
+QUICK_OBJECTS = [1, 10, 100]
+FULL_VARIANTS = [100, 1000, 10000, 100000]
+FULL_OBJECTS = [1, 10, 100, 1000]
+# Variants of the object scaling cases
+OBJECT_CASE_VARIANTS = 100
+# Variants of the fast versus normal mode case
+MODE_CASE_VARIANTS = 200
+
+# Metrics where a higher value is a regression, used for the baseline comparison
+COMPARED_METRICS = ['overhead_per_variant_ms', 'overhead_per_file_ms', 'peak_memory_mb', 'per_filename_us', 'per_variant_us']
+# Deterministic metrics; the others are allowed the noise of the repeats on top of the tolerance
+EXACT_METRICS = ['peak_memory_mb']
+
+
+def make_config(outputFolder, variantCount, args, fastMode=True):
+    """Two swept parameters with realistic value strings, numbered filenames"""
+    # Split the variant count into two axes of similar length
+    first = max(divisor for divisor in range(1, int(variantCount ** 0.5) + 1) if variantCount % divisor == 0)
+    second = variantCount // first
+    axes = [
+        batch_core.SweepAxis('width', batch_core.NumericRange(10.0, 0.5, first, 'mm'), False, '10 mm'),
+        batch_core.SweepAxis('label', [f'Part "{i}"/rev.{i % 7}' for i in range(second)], True, "'A'")
+    ]
+    return batch_core.BatchConfig(
+        axes, outputFolder, prefix='bench', addNumbering=True, includeParamName=True,
+        reuseDuplicates=args.reuse, fastMode=fastMode, postprocessWorkers=args.workers)
+
+
+def make_units(objectCount):
+    return [batch_core.ExportUnit(f'Body {i}: bracket/{i}') for i in range(objectCount)]
+
+
+def run_once(variantCount, objectCount, args, traceMemory=False, fastMode=True):
+    """One end-to-end run of the export loop in a fresh temporary folder"""
+    outputFolder = tempfile.mkdtemp(prefix='batch_bench_')
+    try:
+        config = make_config(outputFolder, variantCount, args, fastMode)
+        units = make_units(objectCount)
+        backend = batch_core.SimulatedBackend(
+            computeSeconds=args.compute_ms / 1000.0, exportSeconds=args.export_ms / 1000.0,
+            refreshSeconds=args.refresh_ms / 1000.0, fileSize=args.file_size, seed=1)
+        executor = batch_core.BatchExecutor(config, backend)
+        
+        if traceMemory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = executor.run(units)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if traceMemory else None
+        if traceMemory:
+            tracemalloc.stop()
+        
+        variants = config.combination_count()
+        files = result.successCount
+        overhead = max(0.0, elapsed - backend.busySeconds - backend.writeSeconds)
+        return {
+            'variants': variants,
+            'objects': objectCount,
+            'files': files,
+            'elapsed_s': round(elapsed, 4),
+            'backend_s': round(backend.busySeconds, 4),
+            'write_s': round(backend.writeSeconds, 4),
+            'files_per_s': round(files / elapsed, 1) if elapsed else None,
+            'overhead_per_variant_ms': round(1000.0 * overhead / variants, 4) if variants else None,
+            'overhead_per_file_ms': round(1000.0 * overhead / files, 4) if files else None,
+            'peak_memory_mb': round(peak / 2 ** 20, 2) if peak is not None else None
+        }
+    finally:
+        shutil.rmtree(outputFolder, ignore_errors=True)
+
+
+def median_run(runs, metric):
+    """The run with the median value of metric; its 'noise' is the spread of the runs relative to that value"""
+    runs = sorted(runs, key=lambda r: r[metric])
+    record = runs[len(runs) // 2]
+    value = record[metric]
+    record['noise'] = round((runs[-1][metric] - runs[0][metric]) / value, 3) if value else 0.0
+    return record
+
+
+def run_scaling(args):
+    """Scale the variant count with one object, and the object count with OBJECT_CASE_VARIANTS variants"""
+    cases = [(variants, 1) for variants in (FULL_VARIANTS if args.full else QUICK_VARIANTS)]
+    cases += [(OBJECT_CASE_VARIANTS, objects) for objects in (FULL_OBJECTS if args.full else QUICK_OBJECTS) if objects > 1]
+    results = []
+    for variantCount, objectCount in cases:
+        record = median_run([run_once(variantCount, objectCount, args) for _ in range(args.repeat)],
+                            'overhead_per_variant_ms')
+        if not args.no_memory:
+            # Measured in a second run; tracing slows the loop down
+            record['peak_memory_mb'] = run_once(variantCount, objectCount, args, traceMemory=True)['peak_memory_mb']
+        line = (f"  {variantCount:>7} variants x {objectCount:>4} objects: {record['files_per_s']} files/s, "
+                f"overhead {record['overhead_per_variant_ms']} ms/variant (+/-{100 * record['noise']:.0f}%), "
+                f"writes {record['write_s']} s")
+        if record['peak_memory_mb'] is not None:
+            line += f", peak {record['peak_memory_mb']} MB"
+        print(line)
+        results.append(record)
+    return results
+
+
+def run_modes(args):
+    """Wall time of one case in fast mode and in normal mode, which refreshes the viewport after every variant"""
+    modes = {}
+    for name, fastMode in (('fast', True), ('normal', False)):
+        record = median_run([run_once(MODE_CASE_VARIANTS, 1, args, fastMode=fastMode) for _ in range(args.repeat)],
+                            'elapsed_s')
+        modes[name] = record
+        print(f"  {name:>6}: {record['elapsed_s']} s for {record['variants']} variants, "
+              f"backend {record['backend_s']} s, overhead {record['overhead_per_variant_ms']} ms/variant")
+    fast = modes['fast']['elapsed_s']
+    modes['speedup'] = round(modes['normal']['elapsed_s'] / fast, 2) if fast else None
+    print(f"  fast mode speedup: {modes['speedup']}x")
+    return modes
+
+
+def run_naming(args):
+    """Cost of building sanitized filenames, as the executor does for every file"""
+    variantCount = 10000 if args.full else 2000
+    config = make_config(tempfile.gettempdir(), variantCount, args)
+    units = make_units(10)
+    combinations = list(config.iter_combinations())
+    builder = batch_core.FilenameBuilder(config, units)
+    
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        count = 0
+        for variantIdx, combination in enumerate(combinations):
+            for unit in units:
+                builder.build(variantIdx, combination, unit.name)
+                count += 1
+        elapsed = time.perf_counter() - start
+        runs.append({'filenames': count, 'elapsed_s': round(elapsed, 4), 'per_filename_us': round(1e6 * elapsed / count, 3)})
+    return median_run(runs, 'per_filename_us')
+
+
+def run_planning(args):
+    """Cost of planning variants (combinations, expressions, filenames) without exporting"""
+    variantCount = 100000 if args.full else 10000
+    config = make_config(tempfile.gettempdir(), variantCount, args)
+    units = make_units(1)
+    
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        count = sum(1 for job in batch_core.plan_variants(config, units))
+        elapsed = time.perf_counter() - start
+        runs.append({'variants': count, 'elapsed_s': round(elapsed, 4), 'per_variant_us': round(1e6 * elapsed / count, 3)})
+    return median_run(runs, 'per_variant_us')
+
+
+def compare(results, baseline, tolerance):
+    """List metrics that got worse than the baseline by more than tolerance plus the noise of either run"""
+    def flatten(data):
+        flat = {}
+        records = [(f"scaling {record['variants']}x{record['objects']}", record) for record in data['scaling']]
+        records += [(section, data[section]) for section in ('naming', 'planning')]
+        for name, record in records:
+            for metric in COMPARED_METRICS:
+                if record.get(metric) is not None:
+                    noise = 0.0 if metric in EXACT_METRICS else record.get('noise', 0.0)
+                    flat[f'{name} {metric}'] = (record[metric], noise)
+        return flat
+    
+    current = flatten(results)
+    previous = flatten(baseline)
+    regressions = []
+    for key, (value, noise) in current.items():
+        old, oldNoise = previous.get(key, (None, 0.0))
+        allowed = tolerance + max(noise, oldNoise)
+        if old and value > old * (1.0 + allowed):
+            regressions.append(f'{key}: {old} -> {value} (+{100.0 * (value / old - 1.0):.0f}%, allowed {100.0 * allowed:.0f}%)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--full', action='store_true', help='scale to 100k variants and 1,000 objects')
+    parser.add_argument('--compute-ms', type=float, default=0.0, help='simulated compute latency per variant')
+    parser.add_argument('--export-ms', type=float, default=0.0, help='simulated export latency per file')
+    parser.add_argument('--refresh-ms', type=float, default=0.0, help='simulated viewport refresh latency per variant (normal mode only)')
+    parser.add_argument('--compare-modes', action='store_true', help='also time fast mode against normal mode')
+    parser.add_argument('--file-size', type=int, default=1024, help='bytes written per file')
+    parser.add_argument('--workers', type=int, default=0, help='post-processing workers')
+    parser.add_argument('--reuse', action='store_true', help='enable identical-geometry reuse')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case; the median counts')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc runs')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file to write')
+    parser.add_argument('--baseline', help='earlier JSON result to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed slowdown, on top of the noise of the runs, before a metric counts as a regression')
+    args = parser.parse_args()
+    
+    print('Scaling')
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'scaling': run_scaling(args)
+    }
+    results['naming'] = run_naming(args)
+    print(f"Filenames: {results['naming']['per_filename_us']} us each")
+    results['planning'] = run_planning(args)
+    print(f"Planning: {results['planning']['per_variant_us']} us per variant")
+    if args.compare_modes:
+        print('Fast vs normal mode')
+        results['modes'] = run_modes(args)
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    print(f'Results written to {args.output}')
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('Regressions:\n  ' + '\n  '.join(regressions))
+            return 1
+        print('No regressions against the baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
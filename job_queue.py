@@ -0,0 +1,237 @@
+"""Shared job queue that splits one sweep across several Fusion windows.
+
+The first instance plans the sweep into chunks of variations in a SQLite
+database in the output folder. Every instance then claims chunks
+atomically, runs them with the normal export loop and marks them done.
+Workers write their own manifest shard; the instance that finishes last
+merges the shards into the single manifest.
+
+Workers only share the output folder: the queue, its chunk leases and the
+shards are files there, and a worker joins only a queue whose plan
+signature matches its own sweep.
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+
+try:
+    from . import batch_core
+except ImportError:
+    import batch_core
+
+QUEUE_FILE = 'batch_queue.sqlite'
+
+
+def worker_name():
+    """ID of this script instance, unique across Fusion windows on a machine"""
+    return batch_core.sanitize_filename(f'{socket.gethostname()}-{os.getpid()}').replace(' ', '_').replace('.', '_')
+
+
+def plan_signature(config, units):
+    """Hash of everything that decides which files a sweep writes.
+    
+    Every value of every axis is hashed as it is streamed, so ranges are not
+    built; a variation table counts by its path and content instead.
+    Workers only join a queue created for the same sweep and settings.
+    """
+    values = hashlib.sha1()
+    table = config.variationTable
+    if table is not None:
+        values.update(f'{table.path}\0{batch_core.file_sha256(table.path)}'.encode('utf-8'))
+    else:
+        for axis in config.axes:
+            values.update(f'{axis.name}\0{len(axis.values)}\0'.encode('utf-8'))
+            for value in axis.values:
+                values.update(f'{value}\0'.encode('utf-8'))
+    plan = {
+        'axes': [axis.name for axis in config.axes],
+        'values': values.hexdigest(),
+        'variants': config.combination_count(),
+        'zip': config.zipMode,
+        'formats': [config.export_key(selectedFormat) for selectedFormat in config.formats],
+        'units': [unit.name for unit in units],
+        'naming': [config.prefix, config.suffix, config.addNumbering, config.includeParamName, config.filenameTemplate]
+    }
+    return hashlib.sha1(json.dumps(plan, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class JobQueue:
+    """Chunks of one sweep in a SQLite database that several processes share.
+    
+    Every state change runs in an immediate transaction, so claiming a
+    chunk is atomic across processes. A claimed chunk whose worker has not
+    finished it within leaseSeconds is handed out again.
+    """
+    def __init__(self, outputFolder, leaseSeconds=4 * 3600):
+        self.outputFolder = outputFolder
+        self.leaseSeconds = leaseSeconds
+        self.connection = sqlite3.connect(os.path.join(outputFolder, QUEUE_FILE), timeout=60, isolation_level=None)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, start INTEGER, stop INTEGER, '
+            "state TEXT DEFAULT 'pending', worker TEXT, claimed REAL, finished REAL, attempts INTEGER DEFAULT 0)")
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS workers (worker TEXT PRIMARY KEY, started REAL, seen REAL, finished INTEGER DEFAULT 0)')
+    
+    def _transaction(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+    
+    def _meta(self, key):
+        row = self.connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _set_meta(self, key, value):
+        self.connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+    
+    def prepare(self, signature, variantCount, chunkSize):
+        """Create the chunks for a sweep, or join the unfinished queue for the same sweep.
+        
+        Returns True when this call created the queue. A finished queue is
+        replaced; an unfinished queue for a different sweep raises ValueError.
+        """
+        self._transaction()
+        try:
+            existing = self._meta('signature')
+            if existing and self._meta('merged') != '1':
+                if existing != signature:
+                    raise ValueError(f'The output folder has an unfinished queue for a different sweep.\n'
+                                     f'Finish it with the same settings or delete {QUEUE_FILE}.')
+                self.connection.execute('COMMIT')
+                return False
+            
+            self.connection.execute('DELETE FROM chunks')
+            self.connection.execute('DELETE FROM workers')
+            chunkSize = max(1, chunkSize)
+            self.connection.executemany(
+                'INSERT INTO chunks (start, stop) VALUES (?, ?)',
+                ((start, min(start + chunkSize, variantCount)) for start in range(0, variantCount, chunkSize)))
+            self._set_meta('signature', signature)
+            self._set_meta('merged', 0)
+            self._set_meta('created', time.time())
+            self.connection.execute('COMMIT')
+            return True
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+    
+    def register(self, worker):
+        """Record a worker as running; the merge waits until it has finished"""
+        now = time.time()
+        self.connection.execute('INSERT OR REPLACE INTO workers (worker, started, seen, finished) VALUES (?, ?, ?, 0)',
+                                (worker, now, now))
+    
+    def unregister(self, worker):
+        self.connection.execute('UPDATE workers SET finished = 1, seen = ? WHERE worker = ?', (time.time(), worker))
+    
+    def claim(self, worker):
+        """Atomically take the next pending (or abandoned) chunk; returns (chunkId, start, stop) or None"""
+        now = time.time()
+        self._transaction()
+        try:
+            row = self.connection.execute(
+                "SELECT id, start, stop FROM chunks WHERE state = 'pending' OR (state = 'claimed' AND claimed < ?) "
+                'ORDER BY id LIMIT 1', (now - self.leaseSeconds,)).fetchone()
+            self.connection.execute('UPDATE workers SET seen = ? WHERE worker = ?', (now, worker))
+            if row:
+                self.connection.execute(
+                    "UPDATE chunks SET state = 'claimed', worker = ?, claimed = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker, now, row[0]))
+            self.connection.execute('COMMIT')
+            return row
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+    
+    def complete(self, chunkId, worker):
+        self.connection.execute(
+            "UPDATE chunks SET state = 'done', finished = ? WHERE id = ? AND worker = ?", (time.time(), chunkId, worker))
+    
+    def release(self, chunkId, worker):
+        """Hand an unfinished chunk back to the queue"""
+        self.connection.execute(
+            "UPDATE chunks SET state = 'pending', worker = NULL WHERE id = ? AND worker = ? AND state = 'claimed'",
+            (chunkId, worker))
+    
+    def counts(self):
+        """Number of chunks per state"""
+        return dict(self.connection.execute('SELECT state, COUNT(*) FROM chunks GROUP BY state').fetchall())
+    
+    def try_start_merge(self):
+        """True for exactly one caller, once every chunk is done and every worker has finished.
+        
+        Workers not heard from within the lease are assumed to have crashed.
+        """
+        self._transaction()
+        try:
+            remaining = self.connection.execute("SELECT COUNT(*) FROM chunks WHERE state != 'done'").fetchone()[0]
+            running = self.connection.execute('SELECT COUNT(*) FROM workers WHERE finished = 0 AND seen >= ?',
+                                              (time.time() - self.leaseSeconds,)).fetchone()[0]
+            start = remaining == 0 and running == 0 and self._meta('merged') == '0'
+            if start:
+                self._set_meta('merged', 1)
+            self.connection.execute('COMMIT')
+            return start
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+    
+    def summary(self):
+        """Text describing how the chunks were shared out"""
+        rows = self.connection.execute(
+            "SELECT worker, COUNT(*), SUM(stop - start), MIN(claimed), MAX(finished) FROM chunks "
+            "WHERE state = 'done' GROUP BY worker ORDER BY worker").fetchall()
+        lines = [f'Farm: {sum(row[1] for row in rows)} chunks by {len(rows)} worker(s)']
+        for worker, chunkCount, variantCount, firstClaim, lastFinish in rows:
+            lines.append(f'  {worker}: {chunkCount} chunks, {variantCount} variations, {lastFinish - firstClaim:.1f}s')
+        return '\n'.join(lines)
+    
+    def close(self):
+        self.connection.close()
+
+
+def iter_claims(queue, worker):
+    """Yield (start, stop) variant ranges claimed from the queue until none are left.
+    
+    A chunk counts as done when the next one is requested; closing the
+    generator early (cancel or failure) hands the current chunk back.
+    """
+    while True:
+        row = queue.claim(worker)
+        if row is None:
+            return
+        chunkId, start, stop = row
+        try:
+            yield start, stop
+        except GeneratorExit:
+            queue.release(chunkId, worker)
+            raise
+        queue.complete(chunkId, worker)
+
+
+def merge_worker_files(outputFolder, filename=batch_core.MANIFEST_FILE, replace=False):
+    """Append every worker's shard of a shared file (the manifest by default) to it and remove the shards.
+    
+    replace starts the shared file over, for files that describe only the
+    latest run such as the failed-files job. Returns the number of entries merged.
+    """
+    merged = 0
+    manifestPath = os.path.join(outputFolder, filename)
+    shards = batch_core.worker_files(outputFolder, filename)
+    if replace and not shards:
+        if os.path.exists(manifestPath):
+            os.remove(manifestPath)
+        return 0
+    with open(manifestPath, 'w' if replace else 'a', encoding='utf-8') as out:
+        for name in shards:
+            shardPath = os.path.join(outputFolder, name)
+            with open(shardPath, 'r', encoding='utf-8') as shard:
+                for line in shard:
+                    if line.strip():
+                        out.write(line if line.endswith('\n') else line + '\n')
+                        merged += 1
+            out.flush()
+            os.remove(shardPath)
+    return merged
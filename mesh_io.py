@@ -0,0 +1,435 @@
+"""Mesh file helpers for the batch parameter export.
+
+Functions take file paths and TriangleMesh objects (flat coordinate and
+index arrays) and return plain data, so validate_stl and
+ascii_stl_to_binary can run in post-processing worker processes. NumPy is
+used for the vectorized paths when it is installed; every function also
+works without it.
+"""
+import math
+import os
+import struct
+import zipfile
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STL_HEADER_SIZE = 80
+STL_RECORD = struct.Struct('<12fH')
+
+if np is not None:
+    # One binary STL triangle record, 50 bytes
+    STL_DTYPE = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+
+# Scale from Fusion's internal centimeters to the export unit
+UNIT_SCALE_FROM_CM = {
+    'Millimeters': 10.0,
+    'Centimeters': 1.0,
+    'Meters': 0.01,
+    'Inches': 1.0 / 2.54,
+    'Feet': 1.0 / 30.48
+}
+
+THREEMF_UNITS = {
+    'Millimeters': 'millimeter',
+    'Centimeters': 'centimeter',
+    'Meters': 'meter',
+    'Inches': 'inch',
+    'Feet': 'foot'
+}
+
+
+def is_ascii_stl(path):
+    """True when an STL file is in ASCII format.
+    
+    Binary files may also start with 'solid', so the size is checked
+    against the triangle count in the binary header as well.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(STL_HEADER_SIZE + 4)
+    if not head.lstrip().lower().startswith(b'solid'):
+        return False
+    if len(head) == STL_HEADER_SIZE + 4:
+        triangleCount = struct.unpack('<I', head[STL_HEADER_SIZE:])[0]
+        if os.path.getsize(path) == STL_HEADER_SIZE + 4 + triangleCount * STL_RECORD.size:
+            return False
+    return True
+
+
+def iter_ascii_stl_facets(path):
+    """Yield (normal, v1, v2, v3) tuples of floats from an ASCII STL file"""
+    normal = None
+    vertices = []
+    with open(path, 'r', encoding='ascii', errors='replace') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            keyword = parts[0].lower()
+            if keyword == 'facet':
+                normal = tuple(float(v) for v in parts[2:5])
+                vertices = []
+            elif keyword == 'vertex':
+                vertices.append(tuple(float(v) for v in parts[1:4]))
+            elif keyword == 'endfacet':
+                if len(vertices) != 3:
+                    raise ValueError(f'Facet with {len(vertices)} vertices in {path}')
+                yield (normal or (0.0, 0.0, 0.0), vertices[0], vertices[1], vertices[2])
+
+
+def ascii_stl_to_binary(path):
+    """Rewrite an ASCII STL file as binary STL in place; binary files are left alone"""
+    if not is_ascii_stl(path):
+        return False
+    
+    tempPath = path + '.tmp'
+    triangleCount = 0
+    with open(tempPath, 'wb') as out:
+        out.write(b'Binary STL converted from ASCII'.ljust(STL_HEADER_SIZE, b' '))
+        out.write(struct.pack('<I', 0))
+        for normal, v1, v2, v3 in iter_ascii_stl_facets(path):
+            out.write(STL_RECORD.pack(*normal, *v1, *v2, *v3, 0))
+            triangleCount += 1
+        out.seek(STL_HEADER_SIZE)
+        out.write(struct.pack('<I', triangleCount))
+    
+    # Replacing (rather than rewriting) also breaks hardlinks to reused files
+    os.replace(tempPath, path)
+    return True
+
+
+class TriangleMesh:
+    """Indexed triangle mesh held in flat buffers.
+    
+    coordinates holds x, y, z per node and indices three node indices per
+    triangle. With NumPy they are (n, 3) arrays, otherwise array('d') and
+    array('q') buffers.
+    """
+    def __init__(self, coordinates, indices):
+        if np is not None:
+            self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+            self.indices = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        else:
+            self.coordinates = array('d', coordinates)
+            self.indices = array('q', indices)
+            
+    @property
+    def triangleCount(self):
+        return len(self.indices) if np is not None else len(self.indices) // 3
+    
+    @classmethod
+    def merge(cls, meshes):
+        """Combine several meshes into one, offsetting the node indices"""
+        if np is not None:
+            offsets = np.cumsum([0] + [len(m.coordinates) for m in meshes[:-1]])
+            coordinates = np.concatenate([m.coordinates for m in meshes]) if meshes else np.zeros((0, 3))
+            indices = np.concatenate([m.indices + offset for m, offset in zip(meshes, offsets)]) if meshes else np.zeros((0, 3), dtype=np.int64)
+            return cls(coordinates, indices)
+        
+        coordinates = array('d')
+        indices = array('q')
+        for mesh in meshes:
+            offset = len(coordinates) // 3
+            coordinates.extend(mesh.coordinates)
+            indices.extend(i + offset for i in mesh.indices)
+        return cls(coordinates, indices)
+    
+    def triangles(self, scale=1.0):
+        """Triangle corner coordinates: an (n, 3, 3) array, or a list of 9-tuples without NumPy"""
+        if np is not None:
+            return self.coordinates[self.indices] * scale
+        c = self.coordinates
+        result = []
+        for t in range(0, len(self.indices), 3):
+            corners = []
+            for i in self.indices[t:t + 3]:
+                corners.extend((c[3 * i] * scale, c[3 * i + 1] * scale, c[3 * i + 2] * scale))
+            result.append(tuple(corners))
+        return result
+    
+    
+def uv_sphere(radius, segments):
+    """Closed sphere mesh centred on the origin, used by the simulated backend"""
+    rings = max(2, segments // 2)
+    segments = max(3, segments)
+    coordinates = [0.0, 0.0, radius]
+    for ring in range(1, rings):
+        phi = math.pi * ring / rings
+        for seg in range(segments):
+            theta = 2 * math.pi * seg / segments
+            coordinates.extend((radius * math.sin(phi) * math.cos(theta),
+                                radius * math.sin(phi) * math.sin(theta),
+                                radius * math.cos(phi)))
+    coordinates.extend((0.0, 0.0, -radius))
+    bottom = len(coordinates) // 3 - 1
+    
+    def node(ring, seg):
+        return 1 + (ring - 1) * segments + seg % segments
+    
+    indices = []
+    for seg in range(segments):
+        indices.extend((0, node(1, seg), node(1, seg + 1)))
+        indices.extend((bottom, node(rings - 1, seg + 1), node(rings - 1, seg)))
+    for ring in range(1, rings - 1):
+        for seg in range(segments):
+            a, b = node(ring, seg), node(ring, seg + 1)
+            c, d = node(ring + 1, seg), node(ring + 1, seg + 1)
+            indices.extend((a, c, d, a, d, b))
+    return TriangleMesh(coordinates, indices)
+
+
+def facet_normal(x1, y1, z1, x2, y2, z2, x3, y3, z3):
+    """Unit normal of one triangle (zero for degenerate triangles)"""
+    ux, uy, uz = x2 - x1, y2 - y1, z2 - z1
+    vx, vy, vz = x3 - x1, y3 - y1, z3 - z1
+    nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+    length = math.sqrt(nx * nx + ny * ny + nz * nz)
+    if length == 0:
+        return 0.0, 0.0, 0.0
+    return nx / length, ny / length, nz / length
+
+
+def facet_normals(triangles):
+    """Unit normals for an (n, 3, 3) triangle array"""
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    return normals / lengths[:, None]
+
+
+def write_stl_binary(path, mesh, scale=1.0):
+    """Write a binary STL file"""
+    with open(path, 'wb') as f:
+        f.write(b'Binary STL'.ljust(STL_HEADER_SIZE, b' '))
+        f.write(struct.pack('<I', mesh.triangleCount))
+        if np is not None:
+            triangles = mesh.triangles(scale)
+            records = np.zeros(len(triangles), dtype=STL_DTYPE)
+            records['normal'] = facet_normals(triangles)
+            records['vertices'] = triangles
+            records.tofile(f)
+        else:
+            for corners in mesh.triangles(scale):
+                f.write(STL_RECORD.pack(*facet_normal(*corners), *corners, 0))
+                
+                
+ASCII_FACET = ('facet normal %e %e %e\n outer loop\n  vertex %e %e %e\n  vertex %e %e %e\n'
+               '  vertex %e %e %e\n endloop\nendfacet\n')
+
+
+def write_stl_ascii(path, mesh, scale=1.0, name='mesh'):
+    """Write an ASCII STL file"""
+    if np is not None:
+        triangles = mesh.triangles(scale)
+        rows = np.hstack([facet_normals(triangles), triangles.reshape(-1, 9)]).tolist()
+    else:
+        rows = [facet_normal(*corners) + corners for corners in mesh.triangles(scale)]
+    with open(path, 'w', encoding='ascii') as f:
+        f.write(f'solid {name}\n')
+        f.writelines(ASCII_FACET % tuple(row) for row in rows)
+        f.write(f'endsolid {name}\n')
+        
+        
+def scaled_nodes(mesh, scale):
+    """Node coordinates as a list of (x, y, z) rows"""
+    if np is not None:
+        return (mesh.coordinates * scale).tolist()
+    c = mesh.coordinates
+    return [(c[i] * scale, c[i + 1] * scale, c[i + 2] * scale) for i in range(0, len(c), 3)]
+
+
+def triangle_rows(mesh):
+    """Triangle node indices as a list of (a, b, c) rows"""
+    if np is not None:
+        return mesh.indices.tolist()
+    idx = mesh.indices
+    return [(idx[i], idx[i + 1], idx[i + 2]) for i in range(0, len(idx), 3)]
+
+
+def write_obj(path, mesh, scale=1.0):
+    """Write a Wavefront OBJ file (geometry only)"""
+    with open(path, 'w', encoding='ascii') as f:
+        f.writelines('v %.6f %.6f %.6f\n' % tuple(node) for node in scaled_nodes(mesh, scale))
+        f.writelines('f %d %d %d\n' % (a + 1, b + 1, c + 1) for a, b, c in triangle_rows(mesh))
+        
+        
+THREEMF_CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                         '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+                         '</Types>')
+THREEMF_RELS = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+                'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+                '</Relationships>')
+
+
+def write_3mf(path, mesh, scale=1.0, unit='millimeter'):
+    """Write a single-object 3MF package (geometry only)"""
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        f'<model unit="{unit}" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">',
+        '<resources><object id="1" type="model"><mesh><vertices>'
+    ]
+    parts.extend('<vertex x="%.6f" y="%.6f" z="%.6f"/>' % tuple(node) for node in scaled_nodes(mesh, scale))
+    parts.append('</vertices><triangles>')
+    parts.extend('<triangle v1="%d" v2="%d" v3="%d"/>' % tuple(row) for row in triangle_rows(mesh))
+    parts.append('</triangles></mesh></object></resources><build><item objectid="1"/></build></model>')
+    
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', THREEMF_CONTENT_TYPES)
+        package.writestr('_rels/.rels', THREEMF_RELS)
+        package.writestr('3D/3dmodel.model', ''.join(parts))
+        
+        
+def write_mesh(path, mesh, selectedFormat, unitName):
+    """Write a mesh tessellated in centimeters in one of the mesh export formats"""
+    scale = UNIT_SCALE_FROM_CM.get(unitName, 10.0)
+    if 'STL' in selectedFormat:
+        if 'ASCII' in selectedFormat:
+            write_stl_ascii(path, mesh, scale)
+        else:
+            write_stl_binary(path, mesh, scale)
+    elif 'OBJ' in selectedFormat:
+        write_obj(path, mesh, scale)
+    elif '3MF' in selectedFormat:
+        write_3mf(path, mesh, scale, THREEMF_UNITS.get(unitName, 'millimeter'))
+    else:
+        raise ValueError(f'{selectedFormat} is not a mesh format')
+
+
+# Approximate bytes per triangle of each mesh format (OBJ and 3MF share vertices; 3MF is zipped)
+BYTES_PER_TRIANGLE = {'STL (Binary)': 50, 'STL (ASCII)': 250, 'OBJ': 35, '3MF': 16}
+
+
+def triangles_for_file_size(sizeBytes, selectedFormat):
+    """Roughly how many triangles fit into a file of sizeBytes in a mesh format"""
+    for formatName, bytesPerTriangle in BYTES_PER_TRIANGLE.items():
+        if selectedFormat.startswith(formatName):
+            return max(1, int(sizeBytes / bytesPerTriangle))
+    raise ValueError(f'{selectedFormat} is not a mesh format')
+
+
+def binary_stl_triangle_count(path):
+    """Triangle count from a binary STL header, checked against the file size"""
+    with open(path, 'rb') as f:
+        f.seek(STL_HEADER_SIZE)
+        head = f.read(4)
+    if len(head) < 4:
+        raise ValueError('truncated STL header')
+    triangleCount = struct.unpack('<I', head)[0]
+    if os.path.getsize(path) < STL_HEADER_SIZE + 4 + triangleCount * STL_RECORD.size:
+        raise ValueError(f'file is shorter than its {triangleCount} triangles')
+    return triangleCount
+
+
+def read_stl_vertices(path):
+    """Triangle corners of an STL file.
+    
+    Binary files are memory-mapped with NumPy and returned as an (n, 3, 3)
+    float32 view without copying. Without NumPy (or for ASCII files) a
+    list of 9-tuples is returned instead.
+    """
+    if is_ascii_stl(path):
+        facets = [v1 + v2 + v3 for normal, v1, v2, v3 in iter_ascii_stl_facets(path)]
+        return np.asarray(facets, dtype=np.float32).reshape(-1, 3, 3) if np is not None else facets
+    
+    triangleCount = binary_stl_triangle_count(path)
+    if np is not None:
+        if triangleCount == 0:
+            return np.zeros((0, 3, 3), dtype=np.float32)
+        records = np.memmap(path, dtype=STL_DTYPE, mode='r', offset=STL_HEADER_SIZE + 4, shape=(triangleCount,))
+        return records['vertices']
+    
+    with open(path, 'rb') as f:
+        f.seek(STL_HEADER_SIZE + 4)
+        return [STL_RECORD.unpack(f.read(STL_RECORD.size))[3:12] for _ in range(triangleCount)]
+    
+    
+def mesh_statistics(triangles):
+    """Triangle count, bounding box, surface area, signed volume and edge counts.
+    
+    openEdges counts edges used by a single triangle and nonManifoldEdges
+    edges shared by more than two; both are zero for a closed solid.
+    Corners are matched by exact coordinates, as STL stores them.
+    """
+    if np is not None:
+        triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+        count = len(triangles)
+        if count == 0:
+            return {'triangles': 0, 'bboxMin': None, 'bboxMax': None, 'area': 0.0, 'volume': 0.0,
+                    'openEdges': 0, 'nonManifoldEdges': 0}
+        v0, v1, v2 = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+        corners = triangles.reshape(-1, 3)
+        area = 0.5 * np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1).sum()
+        volume = np.einsum('ij,ij->i', v0, np.cross(v1, v2)).sum() / 6.0
+        
+        # Number the distinct corners, then count how often each undirected edge occurs
+        _, nodeIds = np.unique(corners, axis=0, return_inverse=True)
+        nodeIds = nodeIds.reshape(-1, 3)
+        edges = np.concatenate([nodeIds[:, [0, 1]], nodeIds[:, [1, 2]], nodeIds[:, [2, 0]]])
+        edges.sort(axis=1)
+        _, edgeUses = np.unique(edges, axis=0, return_counts=True)
+        return {
+            'triangles': int(count),
+            'bboxMin': corners.min(axis=0).tolist(),
+            'bboxMax': corners.max(axis=0).tolist(),
+            'area': float(area),
+            'volume': float(volume),
+            'openEdges': int((edgeUses == 1).sum()),
+            'nonManifoldEdges': int((edgeUses > 2).sum())
+        }
+    
+    area = 0.0
+    volume = 0.0
+    low = [math.inf] * 3
+    high = [-math.inf] * 3
+    edgeUses = {}
+    for x1, y1, z1, x2, y2, z2, x3, y3, z3 in triangles:
+        ux, uy, uz = x2 - x1, y2 - y1, z2 - z1
+        vx, vy, vz = x3 - x1, y3 - y1, z3 - z1
+        area += 0.5 * math.sqrt((uy * vz - uz * vy) ** 2 + (uz * vx - ux * vz) ** 2 + (ux * vy - uy * vx) ** 2)
+        volume += (x1 * (y2 * z3 - z2 * y3) - y1 * (x2 * z3 - z2 * x3) + z1 * (x2 * y3 - y2 * x3)) / 6.0
+        a, b, c = (x1, y1, z1), (x2, y2, z2), (x3, y3, z3)
+        for axis in range(3):
+            low[axis] = min(low[axis], a[axis], b[axis], c[axis])
+            high[axis] = max(high[axis], a[axis], b[axis], c[axis])
+        for edge in ((a, b), (b, c), (c, a)):
+            key = edge if edge[0] <= edge[1] else (edge[1], edge[0])
+            edgeUses[key] = edgeUses.get(key, 0) + 1
+    
+    count = len(triangles)
+    return {
+        'triangles': count,
+        'bboxMin': low if count else None,
+        'bboxMax': high if count else None,
+        'area': area,
+        'volume': volume,
+        'openEdges': sum(1 for uses in edgeUses.values() if uses == 1),
+        'nonManifoldEdges': sum(1 for uses in edgeUses.values() if uses > 2)
+    }
+
+
+def validate_stl(path, minTriangles=1, maxOpenEdges=0):
+    """Measure an STL file and list what fails the checks; returns (statistics, problems)"""
+    try:
+        triangles = read_stl_vertices(path)
+    except ValueError as e:
+        return None, [f'unreadable STL ({e})']
+    stats = mesh_statistics(triangles)
+    # Release the memory map so the file can be compressed or removed afterwards
+    del triangles
+    problems = []
+    if stats['triangles'] < minTriangles:
+        problems.append(f"{stats['triangles']} triangles")
+    if stats['openEdges'] > maxOpenEdges:
+        problems.append(f"{stats['openEdges']} open edges")
+    if stats['nonManifoldEdges']:
+        problems.append(f"{stats['nonManifoldEdges']} non-manifold edges")
+    if stats['triangles'] and stats['volume'] <= 0:
+        problems.append('inside-out or zero volume')
+    return stats, problems